@@ -4,42 +4,218 @@ Automated Satellite-OSM Alignment Testing and Correction System
 
 This system will:
 1. Process satellite imagery with proper georeferencing
-2. Test alignment automatically using screenshots
+2. Test alignment automatically by phase-correlating against OSM reference features
 3. Iteratively correct misalignment until perfect (0m error)
 4. Validate alignment using roads, intersections, and landmarks
 """
 
 import os
 import sys
+
+# Keep PROJ/GDAL from probing the network or listing sidecar files on open
+os.environ.setdefault('PROJ_NETWORK', 'OFF')
+os.environ.setdefault('GDAL_DISABLE_READDIR_ON_OPEN', 'EMPTY_DIR')
+
 import numpy as np
 import rasterio
-from rasterio.warp import transform_bounds, reproject, Resampling
+from rasterio.warp import reproject, Resampling
 from rasterio.crs import CRS
+from rasterio.windows import Window, from_bounds
+from rasterio.features import rasterize
+from rasterio.transform import Affine
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import cv2
 import folium
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-import time
+from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
 from datetime import datetime
 from pathlib import Path
 import json
-import matplotlib.pyplot as plt
-from shapely.geometry import Point, Polygon
+import hashlib
+from shapely.geometry import Point, Polygon, LineString
 from pyproj import Transformer
 import logging
+from dataclasses import dataclass
+from functools import lru_cache, cached_property, partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+import threading
 from concurrent.futures import ThreadPoolExecutor
 from pystac_client import Client
 import warnings
 warnings.filterwarnings('ignore')
 
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from scipy import fft as fft_backend
+    FFT_KWARGS = {'workers': -1}
+except ImportError:
+    fft_backend = np.fft
+    FFT_KWARGS = {}
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+
+def json_loads(raw):
+    """Parse JSON bytes, using orjson when available"""
+    return orjson.loads(raw) if orjson else json.loads(raw)
+
+
+def json_dumps(obj, indent=False):
+    """Serialize to JSON bytes, using orjson (with NumPy support) when available"""
+    if orjson:
+        option = orjson.OPT_SERIALIZE_NUMPY | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(obj, option=option)
+    return json.dumps(obj, indent=2 if indent else None).encode()
+
+
+@lru_cache(maxsize=16)
+def get_transformer(src_crs, dst_crs):
+    """Shared always_xy Transformer per (src, dst) CRS pair, e.g. ('EPSG:4326', 'EPSG:3857')"""
+    return Transformer.from_crs(src_crs, dst_crs, always_xy=True)
+
+
+@lru_cache(maxsize=1024)
+def transform_bounds_cached(src_crs, dst_crs, bounds):
+    """Memoized (west, south, east, north) reprojection; bounds must be a tuple"""
+    return get_transformer(src_crs, dst_crs).transform_bounds(*bounds)
+
+
+@dataclass(frozen=True)
+class Location:
+    """WGS84 bounding box of the area under test, with memoized projected views"""
+    west: float
+    south: float
+    east: float
+    north: float
+    
+    @property
+    def center_lat(self):
+        return (self.south + self.north) / 2
+    
+    @property
+    def center_lon(self):
+        return (self.west + self.east) / 2
+    
+    @property
+    def wgs84_bounds(self):
+        return (self.west, self.south, self.east, self.north)
+    
+    @cached_property
+    def mercator_bounds(self):
+        return transform_bounds_cached('EPSG:4326', 'EPSG:3857', self.wgs84_bounds)
+
+
+@lru_cache(maxsize=1)
+def cuda_torch():
+    """torch when it is installed and a CUDA device is present, else None.
+    
+    Imported lazily on first use; torch adds seconds of startup for importers
+    that never correlate.
+    """
+    try:
+        import torch
+    except ImportError:
+        return None
+    return torch if torch.cuda.is_available() else None
+
+
+def correlation_surface(reference, moving):
+    """Normalized cross-power correlation surface, on the GPU when CUDA is available"""
+    torch = cuda_torch()
+    if torch is not None:
+        ref_fft = torch.fft.fft2(torch.from_numpy(reference).to('cuda'))
+        mov_fft = torch.fft.fft2(torch.from_numpy(moving).to('cuda'))
+        cross_power = mov_fft * torch.conj(ref_fft)
+        cross_power /= cross_power.abs() + 1e-12
+        return torch.fft.ifft2(cross_power).real.cpu().numpy()
+    
+    # scipy.fft spreads the transforms over all cores; numpy.fft is single-threaded
+    ref_fft = fft_backend.fft2(reference, **FFT_KWARGS)
+    mov_fft = fft_backend.fft2(moving, **FFT_KWARGS)
+    cross_power = mov_fft * np.conj(ref_fft)
+    cross_power /= np.abs(cross_power) + 1e-12
+    return fft_backend.ifft2(cross_power, **FFT_KWARGS).real
+
+
+def phase_correlation(reference, moving):
+    """Estimate the sub-pixel (dy, dx) shift of `moving` relative to `reference`.
+    
+    Returns the shift and the normalized correlation peak height.
+    """
+    window = cv2.createHanningWindow((reference.shape[1], reference.shape[0]), cv2.CV_32F)
+    correlation = correlation_surface(reference * window, moving * window)
+    
+    h, w = correlation.shape
+    peak_y, peak_x = np.unravel_index(np.argmax(correlation), correlation.shape)
+    peak = correlation[peak_y, peak_x]
+    
+    # Sub-pixel refinement with a parabola through the peak and its neighbours
+    def refine(before, after):
+        denom = before - 2 * peak + after
+        return 0.0 if denom == 0 else 0.5 * (before - after) / denom
+    
+    dy = peak_y + refine(correlation[(peak_y - 1) % h, peak_x], correlation[(peak_y + 1) % h, peak_x])
+    dx = peak_x + refine(correlation[peak_y, (peak_x - 1) % w], correlation[peak_y, (peak_x + 1) % w])
+    
+    # Wrap shifts past the midpoint to negative offsets
+    if dy > h / 2:
+        dy -= h
+    if dx > w / 2:
+        dx -= w
+    
+    return dy, dx, float(peak)
+
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def composite_kernel(red, green, blue, nir, p2, p98, out):
+        """Stretch RGB to uint8 and blend vegetation (NDVI > 0.3) green in one pass"""
+        # Uniform or all-nodata AOIs have p98 == p2; guard the stretch range
+        scale = 255.0 / max(p98 - p2, 1e-6)
+        height, width = red.shape
+        for y in prange(height):
+            for x in range(width):
+                r = min(max((red[y, x] - p2) * scale, 0.0), 255.0)
+                g = min(max((green[y, x] - p2) * scale, 0.0), 255.0)
+                b = min(max((blue[y, x] - p2) * scale, 0.0), 255.0)
+                
+                # Truncate like astype(np.uint8) on the stretched values
+                r, g, b = float(int(r)), float(int(g)), float(int(b))
+                
+                # NDVI > 0.3  <=>  7 * NIR > 13 * red, exact in integers
+                if 7 * np.int64(nir[y, x]) > 13 * np.int64(red[y, x]):
+                    r = 0.6 * r
+                    g = 0.6 * g + 0.4 * 255.0
+                    b = 0.6 * b
+                    out[y, x, 0] = np.uint8(min(r + 0.5, 255.0))
+                    out[y, x, 1] = np.uint8(min(g + 0.5, 255.0))
+                    out[y, x, 2] = np.uint8(min(b + 0.5, 255.0))
+                else:
+                    out[y, x, 0] = np.uint8(r)
+                    out[y, x, 1] = np.uint8(g)
+                    out[y, x, 2] = np.uint8(b)
+
+
+class QuietHTTPRequestHandler(SimpleHTTPRequestHandler):
+    """Static file handler that keeps per-request access logs out of the output"""
+    
+    def log_message(self, format, *args):
+        pass
+
+
 class AlignmentTestingSystem:
     """Comprehensive alignment testing and correction system"""
     
@@ -53,9 +229,10 @@ class AlignmentTestingSystem:
         self.screenshots_dir = self.base_dir / "screenshots"
         self.satellite_dir = self.base_dir / "satellite_data"
         self.results_dir = self.base_dir / "results"
+        self.cache_dir = self.base_dir / "cache"
         
         # Create directories
-        for dir_path in [self.screenshots_dir, self.satellite_dir, self.results_dir]:
+        for dir_path in [self.screenshots_dir, self.satellite_dir, self.results_dir, self.cache_dir]:
             dir_path.mkdir(parents=True, exist_ok=True)
         
         # Configuration
@@ -63,60 +240,133 @@ class AlignmentTestingSystem:
         self.zoom_level = 15  # High detail for precise alignment
         self.tolerance_meters = 1.0  # Maximum allowed misalignment in meters
         self.max_iterations = 50  # Maximum correction attempts
+        self.chunked_reproject_pixels = 25_000_000  # Warp larger grids in row strips
+        self.reproject_strip_rows = 512
+        self.overview_factor = 1  # >1 reads COG overviews for quick, coarse previews
+        
+        # OSM services require an identifying User-Agent; the public tile server also allows
+        # at most 2 concurrent connections, so point tile_url at your own server to go faster
+        self.user_agent = ("GreenspaceAlignmentTester/1.0 "
+                           "(+https://github.com/main-salman/greenspace-detection-platform)")
+        self.tile_url = "https://tile.openstreetmap.org/{z}/{x}/{y}.png"
+        self.tile_workers = 2
+        
+        # Reusable reprojection destination buffer
+        self._reproj_buf = None
+        
+        # Reusable CRS transformers (pyproj Transformer construction is expensive)
+        self._to_merc = get_transformer('EPSG:4326', self.target_crs.to_string())
+        self._to_wgs84 = get_transformer(self.target_crs.to_string(), 'EPSG:4326')
+        
+        # Satellite line features, keyed by the (immutable) image they came from
+        self._satellite_features = (None, None)
+        
+        # Overpass ways projected to the target CRS, keyed by the elements list identity
+        self._reference_shapes = (None, [])
+        
+        # Shared HTTP session with connection pooling for Nominatim, Overpass and tiles
+        self.session = requests.Session()
+        retry_strategy = Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=["GET", "POST"]
+        )
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16, max_retries=retry_strategy)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
         
         # STAC client
         self.stac_client = Client.open("https://earth-search.aws.element84.com/v1")
         
-        # Browser setup
-        self.setup_browser()
+        # Browser, Playwright driver and map server; launched by the first screenshot
+        self._playwright = None
+        self.context = None
+        self.page = None
+        self._http_server = None
         
         logger.info(f"Initialized alignment testing system for {city}, {province}, {country}")
     
     def setup_browser(self):
-        """Setup headless Chrome browser for screenshots"""
-        chrome_options = Options()
-        chrome_options.add_argument("--headless")
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--window-size=1920,1080")
-        chrome_options.add_argument("--disable-gpu")
-        
+        """Setup a single headless Chromium page that is reused for screenshots"""
         try:
-            self.driver = webdriver.Chrome(options=chrome_options)
+            # Persistent profile + disk cache so Leaflet JS and OSM tiles survive between runs
+            self._playwright = sync_playwright().start()
+            self.context = self._playwright.chromium.launch_persistent_context(
+                user_data_dir=str(self.base_dir / "chrome_profile"),
+                headless=True,
+                viewport={'width': 1920, 'height': 1080},
+                args=[
+                    "--no-sandbox", "--disable-dev-shm-usage", "--disable-gpu",
+                    f"--disk-cache-dir={self.base_dir / 'chrome_cache'}",
+                    "--disk-cache-size=104857600"
+                ]
+            )
+            self.page = self.context.pages[0] if self.context.pages else self.context.new_page()
+            
+            # Serve the maps over HTTP; Chrome caches http:// resources, not file:// pages
+            handler = partial(QuietHTTPRequestHandler, directory=str(self.screenshots_dir))
+            self._http_server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+            threading.Thread(target=self._http_server.serve_forever, daemon=True).start()
+            
             logger.info("Browser setup successful")
         except Exception as e:
             logger.error(f"Browser setup failed: {e}")
             raise
     
+    def close_browser(self):
+        """Shut down the browser, the Playwright driver and the map server, if started"""
+        if self.context is not None:
+            self.context.close()
+        if self._playwright is not None:
+            self._playwright.stop()
+        if self._http_server is not None:
+            self._http_server.shutdown()
+            self._http_server.server_close()
+        self._playwright = self.context = self.page = self._http_server = None
+    
+    def _cached_json(self, key_text, fetch):
+        """Return fetch() from the on-disk cache, keyed by a hash of key_text"""
+        key = hashlib.blake2b(key_text.encode(), digest_size=16).hexdigest()
+        cache_path = self.cache_dir / f"{key}.json"
+        
+        if cache_path.exists():
+            return json_loads(cache_path.read_bytes())
+        
+        data = fetch()
+        if data:
+            cache_path.write_bytes(json_dumps(data))
+        return data
+    
     def get_city_bounds(self):
         """Get precise city bounds from Nominatim"""
         try:
             address = f"{self.city}, {self.province}, {self.country}"
-            response = requests.get(
-                "https://nominatim.openstreetmap.org/search",
-                params={
-                    'q': address,
-                    'format': 'json',
-                    'limit': 1,
-                    'polygon_geojson': 1
-                },
-                headers={'User-Agent': 'AlignmentTestingSystem/1.0'},
-                timeout=30
-            )
             
-            data = response.json()
+            def fetch():
+                response = self.session.get(
+                    "https://nominatim.openstreetmap.org/search",
+                    params={
+                        'q': address,
+                        'format': 'json',
+                        'limit': 1,
+                        'polygon_geojson': 1
+                    },
+                    headers={'User-Agent': self.user_agent},
+                    timeout=30
+                )
+                response.raise_for_status()
+                return json_loads(response.content)
+            
+            data = self._cached_json(f"{self.city}|{self.province}|{self.country}", fetch)
             if data and 'boundingbox' in data[0]:
                 bbox = data[0]['boundingbox']
-                bounds = {
-                    'south': float(bbox[0]),
-                    'north': float(bbox[1]), 
-                    'west': float(bbox[2]),
-                    'east': float(bbox[3])
-                }
-                
-                # Calculate center point
-                bounds['center_lat'] = (bounds['south'] + bounds['north']) / 2
-                bounds['center_lon'] = (bounds['west'] + bounds['east']) / 2
+                bounds = Location(
+                    south=float(bbox[0]),
+                    north=float(bbox[1]),
+                    west=float(bbox[2]),
+                    east=float(bbox[3])
+                )
                 
                 logger.info(f"City bounds: {bounds}")
                 return bounds
@@ -136,7 +386,7 @@ class AlignmentTestingSystem:
             end_date = datetime(year, month + 1, 1) if month < 12 else datetime(year + 1, 1, 1)
             
             # Search for Sentinel-2 data
-            bbox = [bounds['west'], bounds['south'], bounds['east'], bounds['north']]
+            bbox = list(bounds.wgs84_bounds)
             search = self.stac_client.search(
                 collections=["sentinel-2-l2a"],
                 datetime=f"{start_date.isoformat()}/{end_date.isoformat()}",
@@ -166,67 +416,57 @@ class AlignmentTestingSystem:
         logger.info("Processing satellite item with proper CRS handling...")
         
         try:
-            # Download required bands
+            # Read the AOI window of each required band concurrently
             bands_needed = {'B04': 'red', 'B03': 'green', 'B02': 'blue', 'B08': 'nir'}
+            aoi_bounds = bounds.wgs84_bounds
+            fetched = {}
+            
+            with ThreadPoolExecutor(max_workers=len(bands_needed)) as executor:
+                futures = {
+                    executor.submit(self._fetch_band, item.assets[band_id].href, aoi_bounds): band_name
+                    for band_id, band_name in bands_needed.items()
+                    if band_id in item.assets
+                }
+                for future, band_name in futures.items():
+                    fetched[band_name] = future.result()
+            
+            if len(fetched) != 4:
+                raise Exception(f"Only got {len(fetched)}/4 required bands")
+            
+            # S2 10m bands share one grid, so a single transform/CRS covers the stack
+            source_bands = [fetched[band_name][0] for band_name in bands_needed.values()]
+            src_transform, src_crs = fetched['red'][1], fetched['red'][2]
+            
+            # Define target bounds in Web Mercator
+            target_bounds = bounds.mercator_bounds
+            
+            # Calculate target transform and dimensions
+            pixel_size = 10.0  # 10m resolution in Web Mercator
+            width = int((target_bounds[2] - target_bounds[0]) / pixel_size)
+            height = int((target_bounds[3] - target_bounds[1]) / pixel_size)
+            
+            target_transform = rasterio.transform.from_bounds(
+                *target_bounds, width, height
+            )
+            
+            # Reproject all bands to Web Mercator in one multi-threaded warp so the
+            # PROJ pipeline is set up once instead of once per band. Bands stay in
+            # their native uint16 reflectance, half the bandwidth of float32.
+            src_stack = np.stack(source_bands, axis=0)
+            reprojected_stack = self._reprojection_buffer((len(source_bands), height, width))
+            
+            self._reproject_stack(src_stack, src_transform, src_crs, reprojected_stack, target_transform)
+            
             band_data = {}
+            for band_name, reprojected_data in zip(bands_needed.values(), reprojected_stack):
+                band_data[band_name] = {
+                    'data': reprojected_data,
+                    'transform': target_transform,
+                    'crs': self.target_crs,
+                    'bounds': target_bounds
+                }
             
-            for band_id, band_name in bands_needed.items():
-                if band_id in item.assets:
-                    url = item.assets[band_id].href
-                    
-                    # Download and open with rasterio to preserve CRS
-                    response = requests.get(url, timeout=60)
-                    response.raise_for_status()
-                    
-                    with rasterio.MemoryFile(response.content) as memfile:
-                        with memfile.open() as src:
-                            # Get the CRS and transform info
-                            original_crs = src.crs
-                            original_bounds = src.bounds
-                            original_transform = src.transform
-                            
-                            logger.info(f"Band {band_name}: CRS={original_crs}, Bounds={original_bounds}")
-                            
-                            # Define target bounds in Web Mercator
-                            target_bounds = transform_bounds(
-                                CRS.from_epsg(4326),  # WGS84
-                                self.target_crs,      # Web Mercator
-                                bounds['west'], bounds['south'], bounds['east'], bounds['north']
-                            )
-                            
-                            # Calculate target transform and dimensions
-                            pixel_size = 10.0  # 10m resolution in Web Mercator
-                            width = int((target_bounds[2] - target_bounds[0]) / pixel_size)
-                            height = int((target_bounds[3] - target_bounds[1]) / pixel_size)
-                            
-                            target_transform = rasterio.transform.from_bounds(
-                                *target_bounds, width, height
-                            )
-                            
-                            # Reproject to Web Mercator
-                            reprojected_data = np.zeros((height, width), dtype=np.float32)
-                            
-                            reproject(
-                                source=rasterio.band(src, 1),
-                                destination=reprojected_data,
-                                src_transform=src.transform,
-                                src_crs=src.crs,
-                                dst_transform=target_transform,
-                                dst_crs=self.target_crs,
-                                resampling=Resampling.bilinear
-                            )
-                            
-                            band_data[band_name] = {
-                                'data': reprojected_data,
-                                'transform': target_transform,
-                                'crs': self.target_crs,
-                                'bounds': target_bounds
-                            }
-                            
-                            logger.info(f"Reprojected {band_name}: shape={reprojected_data.shape}")
-            
-            if len(band_data) != 4:
-                raise Exception(f"Only got {len(band_data)}/4 required bands")
+            logger.info(f"Reprojected {len(band_data)} bands: shape={reprojected_stack.shape[1:]}")
             
             # Create composite
             return self.create_georeferenced_composite(band_data, bounds)
@@ -235,6 +475,87 @@ class AlignmentTestingSystem:
             logger.error(f"Error processing satellite item: {e}")
             raise
     
+    def _reprojection_buffer(self, shape):
+        """Return a zeroed uint16 warp destination, reusing the previous one when shapes match"""
+        if self._reproj_buf is None or self._reproj_buf.shape != shape:
+            self._reproj_buf = np.zeros(shape, dtype=np.uint16)
+        else:
+            self._reproj_buf.fill(0)
+        return self._reproj_buf
+    
+    def _reproject_stack(self, source, src_transform, src_crs, destination, dst_transform):
+        """Warp a band stack onto the target grid, in parallel row strips for very large AOIs"""
+        height, width = destination.shape[1:]
+        
+        if height * width <= self.chunked_reproject_pixels:
+            reproject(
+                source=source,
+                destination=destination,
+                src_transform=src_transform,
+                src_crs=src_crs,
+                dst_transform=dst_transform,
+                dst_crs=self.target_crs,
+                resampling=Resampling.bilinear,
+                num_threads=os.cpu_count() or 1,
+                warp_mem_limit=512
+            )
+            return
+        
+        # Each strip warps into its own small buffer, keeping GDAL's working set bounded
+        def warp_strip(row_start):
+            rows = min(self.reproject_strip_rows, height - row_start)
+            strip = np.zeros((destination.shape[0], rows, width), dtype=destination.dtype)
+            reproject(
+                source=source,
+                destination=strip,
+                src_transform=src_transform,
+                src_crs=src_crs,
+                dst_transform=rasterio.windows.transform(Window(0, row_start, width, rows), dst_transform),
+                dst_crs=self.target_crs,
+                resampling=Resampling.bilinear
+            )
+            destination[:, row_start:row_start + rows] = strip
+        
+        logger.info(f"Reprojecting {height}x{width} grid in {self.reproject_strip_rows}-row strips")
+        with ThreadPoolExecutor(max_workers=os.cpu_count() or 1) as executor:
+            list(executor.map(warp_strip, range(0, height, self.reproject_strip_rows)))
+    
+    def _fetch_band(self, url, aoi_bounds):
+        """Read only the AOI window of a remote COG band.
+        
+        With overview_factor > 1 the window is read at reduced resolution, which
+        GDAL serves from the COG's internal overviews.
+        """
+        with rasterio.Env(
+            AWS_NO_SIGN_REQUEST='YES',
+            GDAL_DISABLE_READDIR_ON_OPEN='EMPTY_DIR',
+            CPL_VSIL_CURL_USE_HEAD='NO',
+            GDAL_HTTP_MERGE_CONSECUTIVE_RANGES='YES',
+            GDAL_HTTP_MULTIPLEX='YES',
+            GDAL_HTTP_VERSION='2',
+            VSI_CACHE='TRUE',
+            CPL_VSIL_CURL_ALLOWED_EXTENSIONS='.tif'
+        ):
+            with rasterio.open(url) as src:
+                src_bbox = transform_bounds_cached('EPSG:4326', src.crs.to_string(), aoi_bounds)
+                window = from_bounds(*src_bbox, transform=src.transform)
+                window = window.intersection(Window(0, 0, src.width, src.height))
+                window = window.round_offsets().round_lengths()
+                
+                logger.info(f"Band {Path(url).name}: CRS={src.crs}, Window={window}")
+                
+                out_shape = (
+                    max(1, int(window.height / self.overview_factor)),
+                    max(1, int(window.width / self.overview_factor))
+                )
+                data = src.read(1, window=window, out_shape=out_shape, resampling=Resampling.bilinear)
+                
+                # Scale the window transform to the (possibly decimated) read shape
+                transform = src.window_transform(window) * Affine.scale(
+                    window.width / out_shape[1], window.height / out_shape[0]
+                )
+                return data, transform, src.crs
+    
     def create_georeferenced_composite(self, band_data, bounds):
         """Create composite with georeferencing metadata"""
         logger.info("Creating georeferenced composite...")
@@ -248,27 +569,33 @@ class AlignmentTestingSystem:
             
             logger.info(f"Band shapes: R={red.shape}, G={green.shape}, B={blue.shape}, NIR={nir.shape}")
             
-            # Create RGB composite
-            rgb = np.stack([red, green, blue], axis=-1)
-            
-            # Normalize using percentiles
-            p2, p98 = np.percentile(rgb, [2, 98])
-            rgb_normalized = np.clip((rgb - p2) / (p98 - p2), 0, 1)
-            rgb_uint8 = (rgb_normalized * 255).astype(np.uint8)
-            
-            # Calculate NDVI for vegetation
-            ndvi = (nir - red) / (nir + red + 1e-8)
-            vegetation_mask = ndvi > 0.3
-            
-            # Apply vegetation highlighting
-            vegetation_overlay = rgb_uint8.copy()
-            vegetation_overlay[vegetation_mask] = cv2.addWeighted(
-                rgb_uint8[vegetation_mask],
-                0.6,
-                np.full_like(rgb_uint8[vegetation_mask], [0, 255, 0]),
-                0.4,
-                0
-            )
+            # Normalize using percentiles of a 1% strided sample (ravel is a view here)
+            sample = np.concatenate([band.ravel()[::100] for band in (red, green, blue)])
+            p2, p98 = np.percentile(sample, [2, 98])
+            
+            if NUMBA_AVAILABLE:
+                # Fused stretch + NDVI + vegetation blend, no intermediate arrays
+                vegetation_overlay = np.empty(red.shape + (3,), dtype=np.uint8)
+                composite_kernel(red, green, blue, nir, float(p2), float(p98), vegetation_overlay)
+            else:
+                # Create RGB composite
+                rgb = np.stack([red, green, blue], axis=-1)
+                rgb_normalized = np.clip((rgb - np.float32(p2)) / np.float32(max(p98 - p2, 1e-6)), 0, 1)
+                rgb_uint8 = (rgb_normalized * 255).astype(np.uint8)
+                
+                # NDVI > 0.3  <=>  7 * NIR > 13 * red, exact in integers
+                vegetation_mask = 7 * nir.astype(np.int32) > 13 * red.astype(np.int32)
+                
+                # Apply vegetation highlighting in place; rgb_uint8 is not reused
+                vegetation_overlay = rgb_uint8
+                if vegetation_mask.any():  # addWeighted returns None for empty selections
+                    vegetation_overlay[vegetation_mask] = cv2.addWeighted(
+                        rgb_uint8[vegetation_mask],
+                        0.6,
+                        np.full_like(rgb_uint8[vegetation_mask], [0, 255, 0]),
+                        0.4,
+                        0
+                    )
             
             # Save georeferenced output
             output_path = self.satellite_dir / f"{self.city}_satellite_georeferenced.tif"
@@ -276,22 +603,30 @@ class AlignmentTestingSystem:
             transform = band_data['red']['transform']
             crs = band_data['red']['crs']
             
+            # Tiled, DEFLATE-compressed Cloud Optimized GeoTIFF with threaded encoding
             with rasterio.open(
                 output_path,
                 'w',
-                driver='GTiff',
+                driver='COG',
                 height=vegetation_overlay.shape[0],
                 width=vegetation_overlay.shape[1],
                 count=3,
                 dtype=vegetation_overlay.dtype,
                 crs=crs,
-                transform=transform
+                transform=transform,
+                blocksize=512,
+                compress='DEFLATE',
+                predictor=2,
+                num_threads='ALL_CPUS',
+                bigtiff='IF_SAFER'
             ) as dst:
-                for i in range(3):
-                    dst.write(vegetation_overlay[:, :, i], i + 1)
+                dst.write(vegetation_overlay.transpose(2, 0, 1))
             
             logger.info(f"Saved georeferenced satellite image: {output_path}")
             
+            # Alignment corrections only move the transform, so freeze the pixels
+            vegetation_overlay.setflags(write=False)
+            
             return {
                 'image': vegetation_overlay,
                 'transform': transform,
@@ -304,14 +639,18 @@ class AlignmentTestingSystem:
             logger.error(f"Error creating composite: {e}")
             raise
     
-    def create_test_map(self, bounds, satellite_data, iteration=0):
+    def create_test_map(self, bounds, satellite_data, iteration=0, reference_elements=None):
         """Create test map with satellite overlay and OSM base"""
         logger.info(f"Creating test map for iteration {iteration}...")
         
         try:
+            # Callers that already hold the (static) reference features pass them in
+            if reference_elements is None:
+                reference_elements = self.fetch_reference_features(bounds)
+            
             # Create folium map centered on city
             m = folium.Map(
-                location=[bounds['center_lat'], bounds['center_lon']],
+                location=[bounds.center_lat, bounds.center_lon],
                 zoom_start=self.zoom_level,
                 tiles='OpenStreetMap'
             )
@@ -320,9 +659,8 @@ class AlignmentTestingSystem:
             sat_bounds = satellite_data['bounds']
             
             # Convert Web Mercator bounds back to WGS84 for folium
-            transformer = Transformer.from_crs(self.target_crs, CRS.from_epsg(4326), always_xy=True)
-            west, south = transformer.transform(sat_bounds[0], sat_bounds[1])
-            east, north = transformer.transform(sat_bounds[2], sat_bounds[3])
+            west, south = self._to_wgs84.transform(sat_bounds[0], sat_bounds[1])
+            east, north = self._to_wgs84.transform(sat_bounds[2], sat_bounds[3])
             
             # Save satellite image as PNG for overlay
             overlay_path = self.screenshots_dir / f"satellite_overlay_iter_{iteration}.png"
@@ -337,7 +675,7 @@ class AlignmentTestingSystem:
             ).add_to(m)
             
             # Add reference points for alignment testing
-            self.add_reference_points(m, bounds)
+            self.add_reference_points(m, reference_elements)
             
             # Add layer control
             folium.LayerControl().add_to(m)
@@ -353,71 +691,90 @@ class AlignmentTestingSystem:
             logger.error(f"Error creating test map: {e}")
             raise
     
-    def add_reference_points(self, map_obj, bounds):
-        """Add reference points for alignment validation"""
-        logger.info("Adding reference points for alignment validation...")
+    def fetch_reference_features(self, bounds):
+        """Fetch reference features (roads, intersections, landmarks) from Overpass"""
+        logger.info("Fetching reference features for alignment validation...")
         
-        # Get reference points from Overpass API (roads, intersections, landmarks)
         overpass_query = f"""
         [out:json][timeout:25];
         (
-          way["highway"~"^(primary|secondary|trunk)$"]({bounds['south']},{bounds['west']},{bounds['north']},{bounds['east']});
-          node["amenity"~"^(hospital|school|police|fire_station)$"]({bounds['south']},{bounds['west']},{bounds['north']},{bounds['east']});
-          way["natural"="coastline"]({bounds['south']},{bounds['west']},{bounds['north']},{bounds['east']});
+          way["highway"~"^(primary|secondary|trunk)$"]({bounds.south},{bounds.west},{bounds.north},{bounds.east});
+          node["amenity"~"^(hospital|school|police|fire_station)$"]({bounds.south},{bounds.west},{bounds.north},{bounds.east});
+          way["natural"="coastline"]({bounds.south},{bounds.west},{bounds.north},{bounds.east});
         );
         out geom;
         """
         
-        try:
-            response = requests.post(
+        def fetch():
+            response = self.session.post(
                 "http://overpass-api.de/api/interpreter",
                 data=overpass_query,
                 timeout=30
             )
-            
-            if response.status_code == 200:
-                data = response.json()
-                
-                # Add roads
-                for element in data['elements']:
-                    if element['type'] == 'way' and 'geometry' in element:
-                        coords = [[p['lat'], p['lon']] for p in element['geometry']]
-                        folium.PolyLine(
-                            coords,
-                            color='red',
-                            weight=3,
-                            opacity=0.8,
-                            popup=f"Reference: {element.get('tags', {}).get('name', 'Road')}"
-                        ).add_to(map_obj)
-                    
-                    elif element['type'] == 'node':
-                        folium.CircleMarker(
-                            [element['lat'], element['lon']],
-                            radius=8,
-                            color='blue',
-                            fill=True,
-                            popup=f"Reference: {element.get('tags', {}).get('name', 'Landmark')}"
-                        ).add_to(map_obj)
-                
-                logger.info(f"Added {len(data['elements'])} reference points")
+            response.raise_for_status()
+            return json_loads(response.content)['elements']
+        
+        try:
+            elements = self._cached_json(overpass_query, fetch)
+            logger.info(f"Fetched {len(elements)} reference features")
+            return elements
             
         except Exception as e:
             logger.warning(f"Could not fetch reference points: {e}")
+            return []
+    
+    def add_reference_points(self, map_obj, elements):
+        """Add reference points for alignment validation"""
+        # Add roads
+        for element in elements:
+            if element['type'] == 'way' and 'geometry' in element:
+                coords = [[p['lat'], p['lon']] for p in element['geometry']]
+                folium.PolyLine(
+                    coords,
+                    color='red',
+                    weight=3,
+                    opacity=0.8,
+                    popup=f"Reference: {element.get('tags', {}).get('name', 'Road')}"
+                ).add_to(map_obj)
+            
+            elif element['type'] == 'node':
+                folium.CircleMarker(
+                    [element['lat'], element['lon']],
+                    radius=8,
+                    color='blue',
+                    fill=True,
+                    popup=f"Reference: {element.get('tags', {}).get('name', 'Landmark')}"
+                ).add_to(map_obj)
+        
+        logger.info(f"Added {len(elements)} reference points")
     
     def capture_screenshot(self, map_path, iteration=0):
         """Capture screenshot of the test map"""
         logger.info(f"Capturing screenshot for iteration {iteration}...")
         
         try:
+            # Analysis-only runs never get here, so Chromium starts on first use
+            if self.page is None:
+                self.setup_browser()
+            
             # Load the map
-            self.driver.get(f"file://{map_path.absolute()}")
+            port = self._http_server.server_address[1]
+            self.page.goto(f"http://127.0.0.1:{port}/{map_path.name}")
             
-            # Wait for map to load
-            time.sleep(5)
+            # Wait for Leaflet and enough loaded tiles to fill the viewport. Tiles that fail
+            # to load never get .leaflet-tile-loaded, so a timeout still takes the screenshot
+            try:
+                self.page.wait_for_function(
+                    """() => typeof L !== 'undefined' &&
+                        document.querySelectorAll('.leaflet-tile-loaded').length > 20""",
+                    timeout=10000
+                )
+            except PlaywrightTimeoutError:
+                logger.warning("Timed out waiting for map tiles; capturing screenshot anyway")
             
             # Take screenshot
             screenshot_path = self.screenshots_dir / f"alignment_test_iter_{iteration}.png"
-            self.driver.save_screenshot(str(screenshot_path))
+            self.page.screenshot(path=str(screenshot_path), full_page=False, animations='disabled')
             
             logger.info(f"Screenshot saved: {screenshot_path}")
             return screenshot_path
@@ -426,44 +783,210 @@ class AlignmentTestingSystem:
             logger.error(f"Error capturing screenshot: {e}")
             raise
     
-    def analyze_alignment(self, screenshot_path, iteration=0):
-        """Analyze alignment accuracy using computer vision"""
+    def _project_reference_ways(self, elements):
+        """Project Overpass ways to the target CRS once per elements list"""
+        cached_elements, shapes = self._reference_shapes
+        if cached_elements is elements:
+            return shapes
+        
+        shapes = []
+        for element in elements:
+            if element['type'] == 'way' and len(element.get('geometry', [])) >= 2:
+                lons = [p['lon'] for p in element['geometry']]
+                lats = [p['lat'] for p in element['geometry']]
+                xs, ys = self._to_merc.transform(lons, lats)
+                shapes.append((LineString(zip(xs, ys)), 1))
+        
+        self._reference_shapes = (elements, shapes)
+        return shapes
+    
+    def rasterize_reference(self, elements, satellite_data):
+        """Burn OSM reference ways into a raster on the satellite image grid"""
+        height, width = satellite_data['image'].shape[:2]
+        transform = satellite_data['transform']
+        
+        shapes = self._project_reference_ways(elements)
+        if not shapes:
+            return np.zeros((height, width), dtype=np.uint8)
+        
+        return rasterize(
+            shapes,
+            out_shape=(height, width),
+            transform=transform,
+            fill=0,
+            all_touched=True,
+            dtype=np.uint8
+        )
+    
+    def build_reference_raster(self, elements, satellite_data):
+        """OSM reference on the satellite grid: Overpass ways, or rendered tiles when none are usable.
+        
+        Always uses the original (uncorrected) grid, so offsets measured against it are totals.
+        """
+        if 'original_transform' in satellite_data:
+            satellite_data = dict(satellite_data, transform=satellite_data['original_transform'],
+                                  bounds=satellite_data['original_bounds'])
+        reference_raster = self.rasterize_reference(elements, satellite_data)
+        if not reference_raster.any():
+            reference_raster = self.rasterize_reference_tiles(satellite_data)
+        return reference_raster
+    
+    def _fetch_tile(self, z, x, y):
+        """Fetch one OSM raster tile as grayscale, caching the PNG on disk"""
+        tile_path = self.cache_dir / "tiles" / str(z) / str(x) / f"{y}.png"
+        
+        if tile_path.exists():
+            tile = cv2.imread(str(tile_path), cv2.IMREAD_GRAYSCALE)
+            if tile is not None:
+                return tile
+            tile_path.unlink()  # Corrupt cache entry; fetch it again
+        
+        response = self.session.get(
+            self.tile_url.format(z=z, x=x, y=y),
+            headers={'User-Agent': self.user_agent},
+            timeout=30
+        )
+        response.raise_for_status()
+        
+        # Error pages (HTML, rate-limit notices) can arrive with a 200 status
+        tile = cv2.imdecode(np.frombuffer(response.content, np.uint8), cv2.IMREAD_GRAYSCALE)
+        if tile is None:
+            raise ValueError(f"tile {z}/{x}/{y} is not a decodable image "
+                             f"(Content-Type: {response.headers.get('Content-Type')})")
+        
+        tile_path.parent.mkdir(parents=True, exist_ok=True)
+        tile_path.write_bytes(response.content)
+        return tile
+    
+    def _fetch_tile_or_none(self, z, x, y):
+        """_fetch_tile that logs and returns None instead of raising"""
+        try:
+            return self._fetch_tile(z, x, y)
+        except Exception as e:
+            logger.warning(f"Skipping OSM tile {z}/{x}/{y}: {e}")
+            return None
+    
+    def rasterize_reference_tiles(self, satellite_data):
+        """Mosaic OSM raster tiles onto the satellite grid and return their edges"""
+        height, width = satellite_data['image'].shape[:2]
+        transform = satellite_data['transform']
+        
+        # Pick the tile zoom whose pixel size is closest to the satellite's, capped at the map zoom
+        world = 20037508.342789244
+        zoom = int(round(np.log2(2 * world / (256 * abs(transform.a)))))
+        zoom = max(0, min(self.zoom_level, zoom))
+        tiles_per_axis = 2 ** zoom
+        tile_size = 2 * world / tiles_per_axis
+        
+        # XYZ tile range covering the satellite bounds (Web Mercator metres)
+        west, south, east, north = satellite_data['bounds']
+        x_min = int((west + world) // tile_size)
+        x_max = int((east + world) // tile_size)
+        y_min = int((world - north) // tile_size)
+        y_max = int((world - south) // tile_size)
+        x_min, y_min = max(x_min, 0), max(y_min, 0)
+        x_max, y_max = min(x_max, tiles_per_axis - 1), min(y_max, tiles_per_axis - 1)
+        
+        coords = [(x, y) for y in range(y_min, y_max + 1) for x in range(x_min, x_max + 1)]
+        with ThreadPoolExecutor(max_workers=self.tile_workers) as executor:
+            tiles = list(executor.map(lambda xy: self._fetch_tile_or_none(zoom, *xy), coords))
+        
+        # Missing tiles become blank (no edges) so the rest of the mosaic stays usable
+        if all(tile is None for tile in tiles):
+            raise Exception(f"Could not fetch any of the {len(tiles)} OSM reference tiles")
+        blank = np.zeros_like(next(tile for tile in tiles if tile is not None))
+        tiles = [blank if tile is None else tile for tile in tiles]
+        
+        columns = x_max - x_min + 1
+        mosaic = np.block([
+            [tiles[row * columns + col] for col in range(columns)]
+            for row in range(y_max - y_min + 1)
+        ])
+        mosaic_transform = rasterio.transform.from_origin(
+            -world + x_min * tile_size, world - y_min * tile_size, tile_size / 256, tile_size / 256
+        )
+        
+        # Both grids are Web Mercator, so this is a pure resample onto the satellite pixels
+        reference = np.zeros((height, width), dtype=np.uint8)
+        reproject(
+            source=mosaic,
+            destination=reference,
+            src_transform=mosaic_transform,
+            src_crs=self.target_crs,
+            dst_transform=transform,
+            dst_crs=self.target_crs,
+            resampling=Resampling.bilinear
+        )
+        
+        return (cv2.Canny(reference, 50, 150, apertureSize=3) > 0).astype(np.uint8)
+    
+    def detect_line_features(self, gray, min_length=30):
+        """Draw LSD line segments of at least min_length pixels into a binary mask.
+        
+        Falls back to Canny edges when no segments are found.
+        """
+        lines = cv2.createLineSegmentDetector().detect(gray)[0]
+        mask = np.zeros(gray.shape, dtype=np.uint8)
+        
+        if lines is not None:
+            for x1, y1, x2, y2 in lines.reshape(-1, 4):
+                if np.hypot(x2 - x1, y2 - y1) >= min_length:
+                    cv2.line(mask, (int(round(x1)), int(round(y1))), (int(round(x2)), int(round(y2))), 1, 1)
+        
+        if not mask.any():
+            mask = (cv2.Canny(gray, 50, 150, apertureSize=3) > 0).astype(np.uint8)
+        
+        return mask
+    
+    def analyze_alignment(self, satellite_data, reference_raster, iteration=0):
+        """Measure the satellite/OSM offset with FFT phase correlation.
+        
+        reference_raster must be on the original grid (see build_reference_raster); the
+        result holds the total offset and the residual left after the applied correction.
+        """
         logger.info(f"Analyzing alignment for iteration {iteration}...")
         
         try:
-            # Load screenshot
-            img = cv2.imread(str(screenshot_path))
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+            if not reference_raster.any():
+                raise Exception("No reference features to align against")
             
-            # Detect features (roads, edges) in the image
-            edges = cv2.Canny(gray, 50, 150, apertureSize=3)
+            # Detect linear features (roads) once; the image is fixed across iterations
+            cached_image, features = self._satellite_features
+            if cached_image is not satellite_data['image']:
+                gray = cv2.cvtColor(satellite_data['image'], cv2.COLOR_RGB2GRAY)
+                features = self.detect_line_features(gray)
+                self._satellite_features = (satellite_data['image'], features)
             
-            # Find line features (roads)
-            lines = cv2.HoughLines(edges, 1, np.pi/180, threshold=100)
+            dy, dx, peak = phase_correlation(
+                reference_raster.astype(np.float32),
+                features.astype(np.float32)
+            )
             
-            alignment_score = 0
-            if lines is not None:
-                # Analyze line alignment patterns
-                # This is a simplified version - in practice, you'd compare
-                # satellite-derived features with OSM-derived features
-                
-                # For now, use edge density as a proxy for alignment quality
-                edge_density = np.sum(edges > 0) / edges.size
-                alignment_score = min(edge_density * 1000, 100)  # Scale to 0-100
+            # Convert the pixel shift to a map-space offset. The reference is rasterized on
+            # the original grid, so this is the total offset; subtract what is already applied
+            transform = satellite_data.get('original_transform', satellite_data['transform'])
+            total_offset_x = dx * transform.a
+            total_offset_y = dy * transform.e
+            applied_x, applied_y = satellite_data.get('applied_offset', (0.0, 0.0))
+            offset_x = total_offset_x - applied_x
+            offset_y = total_offset_y - applied_y
             
-            # Calculate estimated misalignment in meters
-            # This is simplified - real implementation would use feature matching
-            misalignment_meters = max(0, (100 - alignment_score) * 10)
+            alignment_score = min(max(peak * 100, 0), 100)
+            misalignment_meters = float(np.hypot(offset_x, offset_y))
             
             result = {
                 'iteration': iteration,
                 'alignment_score': alignment_score,
                 'misalignment_meters': misalignment_meters,
-                'is_acceptable': misalignment_meters <= self.tolerance_meters,
-                'screenshot_path': str(screenshot_path)
+                'offset_x_meters': float(offset_x),
+                'offset_y_meters': float(offset_y),
+                'total_offset_x_meters': float(total_offset_x),
+                'total_offset_y_meters': float(total_offset_y),
+                'is_acceptable': misalignment_meters <= self.tolerance_meters
             }
             
-            logger.info(f"Alignment analysis: Score={alignment_score:.1f}, Misalignment={misalignment_meters:.1f}m")
+            logger.info(f"Alignment analysis: Score={alignment_score:.1f}, Misalignment={misalignment_meters:.1f}m "
+                        f"(dx={offset_x:.1f}m, dy={offset_y:.1f}m)")
             return result
             
         except Exception as e:
@@ -485,27 +1008,25 @@ class AlignmentTestingSystem:
                 logger.info("Alignment is acceptable, no correction needed")
                 return satellite_data
             
-            # Calculate correction factors
-            misalignment = alignment_result['misalignment_meters']
-            
-            # Apply spatial correction (simplified - real implementation would be more sophisticated)
-            corrected_bounds = satellite_data['bounds'].copy()
-            
-            # Adjust bounds based on detected misalignment
-            # This is a simplified correction - real implementation would use
-            # feature matching and precise geometric transformations
-            correction_factor = min(misalignment / 1000.0, 0.001)  # Small adjustment
+            # Shift the original georeferencing back by the total measured offset, so
+            # corrections replace each other instead of accumulating
+            offset_x = alignment_result['total_offset_x_meters']
+            offset_y = alignment_result['total_offset_y_meters']
+            original_transform = satellite_data.get('original_transform', satellite_data['transform'])
+            original_bounds = satellite_data.get('original_bounds', satellite_data['bounds'])
             
-            corrected_bounds[0] -= correction_factor  # west
-            corrected_bounds[1] -= correction_factor  # south
-            corrected_bounds[2] -= correction_factor  # east
-            corrected_bounds[3] -= correction_factor  # north
+            west, south, east, north = original_bounds
+            corrected_bounds = (west - offset_x, south - offset_y, east - offset_x, north - offset_y)
             
-            # Update satellite data with corrected bounds
+            # Only the georeferencing moves; the pixels are shared, never re-processed
             corrected_data = satellite_data.copy()
+            corrected_data['original_transform'] = original_transform
+            corrected_data['original_bounds'] = original_bounds
+            corrected_data['applied_offset'] = (offset_x, offset_y)
             corrected_data['bounds'] = corrected_bounds
+            corrected_data['transform'] = Affine.translation(-offset_x, -offset_y) * original_transform
             
-            logger.info(f"Applied alignment correction: {correction_factor}")
+            logger.info(f"Applied alignment correction: dx={-offset_x:.2f}m, dy={-offset_y:.2f}m")
             return corrected_data
             
         except Exception as e:
@@ -525,6 +1046,13 @@ class AlignmentTestingSystem:
             # Download satellite data
             satellite_data = self.download_satellite_data(bounds)
             
+            # Reference features are static for the city, so fetch them once
+            reference_elements = self.fetch_reference_features(bounds)
+            
+            # Rasterize the OSM reference once on the original grid; every iteration
+            # measures the total offset against it, so corrections converge
+            reference_raster = self.build_reference_raster(reference_elements, satellite_data)
+            
             # Iterative alignment testing and correction
             results = []
             current_satellite_data = satellite_data
@@ -532,16 +1060,15 @@ class AlignmentTestingSystem:
             for iteration in range(self.max_iterations):
                 logger.info(f"\n=== ITERATION {iteration + 1} ===")
                 
-                # Create test map
-                map_path = self.create_test_map(bounds, current_satellite_data, iteration)
-                
-                # Capture screenshot
-                screenshot_path = self.capture_screenshot(map_path, iteration)
-                
                 # Analyze alignment
-                alignment_result = self.analyze_alignment(screenshot_path, iteration)
+                alignment_result = self.analyze_alignment(
+                    current_satellite_data, reference_raster, iteration
+                )
                 results.append(alignment_result)
                 
+                if 'error' in alignment_result:
+                    break
+                
                 # Check if alignment is acceptable
                 if alignment_result['is_acceptable']:
                     logger.info(f"🎉 PERFECT ALIGNMENT ACHIEVED! Iteration {iteration + 1}")
@@ -559,6 +1086,15 @@ class AlignmentTestingSystem:
             else:
                 logger.warning(f"Maximum iterations ({self.max_iterations}) reached")
             
+            # Render the final alignment once for visual verification
+            if results:
+                map_path = self.create_test_map(
+                    bounds, current_satellite_data, results[-1]['iteration'],
+                    reference_elements=reference_elements
+                )
+                screenshot_path = self.capture_screenshot(map_path, results[-1]['iteration'])
+                results[-1]['screenshot_path'] = str(screenshot_path)
+            
             # Generate final report
             self.generate_alignment_report(results)
             
@@ -570,8 +1106,7 @@ class AlignmentTestingSystem:
         
         finally:
             # Cleanup
-            if hasattr(self, 'driver'):
-                self.driver.quit()
+            self.close_browser()
     
     def generate_alignment_report(self, results):
         """Generate comprehensive alignment test report"""
@@ -590,11 +1125,15 @@ class AlignmentTestingSystem:
             
             # Save JSON report
             report_path = self.results_dir / f"alignment_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-            with open(report_path, 'w') as f:
-                json.dump(report, f, indent=2)
+            report_path.write_bytes(json_dumps(report, indent=True))
             
             # Create visualization
             if results:
+                # Import lazily with the non-interactive backend; only the report needs it
+                import matplotlib
+                matplotlib.use('Agg')
+                import matplotlib.pyplot as plt
+                
                 plt.figure(figsize=(12, 8))
                 
                 iterations = [r['iteration'] for r in results]
@@ -618,7 +1157,7 @@ class AlignmentTestingSystem:
                 
                 plt.tight_layout()
                 plot_path = self.results_dir / f"alignment_progress_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-                plt.savefig(plot_path, dpi=300, bbox_inches='tight')
+                plt.savefig(plot_path, dpi=100, bbox_inches='tight')
                 plt.close()
                 
                 logger.info(f"Report saved: {report_path}")
@@ -652,6 +1191,8 @@ def main():
     parser.add_argument('--country', default='Canada', help='Country')
     parser.add_argument('--tolerance', type=float, default=1.0, help='Tolerance in meters')
     parser.add_argument('--max-iter', type=int, default=50, help='Maximum iterations')
+    parser.add_argument('--overview-factor', type=int, default=1,
+                        help='Read satellite bands at 1/N resolution from COG overviews')
     
     args = parser.parse_args()
     
@@ -660,6 +1201,7 @@ def main():
         system = AlignmentTestingSystem(args.city, args.province, args.country)
         system.tolerance_meters = args.tolerance
         system.max_iterations = args.max_iter
+        system.overview_factor = args.overview_factor
         
         results = system.run_full_alignment_test()
         
@@ -7,23 +7,41 @@ Adapted from the original Jupyter notebook
 import os
 import sys
 import json
+import shutil
 import requests
 import numpy as np
 from datetime import datetime, timedelta
 from pathlib import Path
 import rasterio
 from rasterio.enums import Resampling
-from rasterio.warp import reproject
+from rasterio.warp import reproject, transform_bounds
+from rasterio.windows import Window, from_bounds
+import math
 from shapely.geometry import Polygon
+from pystac import ItemCollection
 from pystac_client import Client
+from pystac_client.stac_api_io import StacApiIO
+import hashlib
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import threading
+from contextlib import contextmanager
 import time
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 import warnings
 warnings.filterwarnings('ignore')
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def json_dumps(obj):
+    """Serialize to indented JSON bytes, using orjson when available"""
+    if orjson:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, indent=2).encode()
+
 def print_progress(percentage, message=""):
     """Print progress in a format that can be parsed by Node.js"""
     print(f"PROGRESS:{percentage} {message}", flush=True)
@@ -38,6 +56,8 @@ class SatelliteDownloader:
         self.end_year = config.get('endYear', 2023)
         self.cloud_threshold = config.get('cloudCoverageThreshold', 20)
         self.output_dir = config['outputDir']
+        self.include_sar = config.get('includeSAR', False)
+        self.cloud_mask = config.get('cloudMask', True)
         
         # Create output directories
         self.raw_dir = os.path.join(self.output_dir, 'satellite_data', 'raw')
@@ -45,20 +65,47 @@ class SatelliteDownloader:
         os.makedirs(self.raw_dir, exist_ok=True)
         os.makedirs(self.processed_dir, exist_ok=True)
         
-        # Initialize STAC client
-        self.stac_client = Client.open("https://earth-search.aws.element84.com/v1")
+        # STAC search results are cached per query for a day
+        self.stac_cache_dir = os.path.join(self.raw_dir, 'stac_cache')
+        os.makedirs(self.stac_cache_dir, exist_ok=True)
+        self.stac_cache_ttl = 24 * 3600
+        
+        # AOI bounds (WGS84) used to clip downloads; set by download_satellite_data
+        self.aoi_bounds = None
+        
+        # Preflight limits so an oversized AOI fails fast instead of filling the disk;
+        # the area cap is opt-in since several supported cities exceed any fixed value
+        self.max_area_km2 = config.get('maxAreaKm2')
+        self.max_download_bytes = config.get('maxDownloadBytes', 100 << 30)
+        
+        # (open seconds, read seconds) measured once by _probe_read_timing
+        self._probe_result = None
         
         # Setup session with retry strategy
         self.session = requests.Session()
+        # Short jittered backoff (0.25s, 0.5s, 1s, ...) that still honors Retry-After on 429/503
         retry_strategy = Retry(
-            total=3,
-            backoff_factor=1,
+            total=5,
+            backoff_factor=0.25,
+            backoff_jitter=0.5,
             status_forcelist=[429, 500, 502, 503, 504],
+            respect_retry_after_header=True,
+            # STAC searches are POSTs on this same session; they are read-only, so safe to retry
+            allowed_methods=frozenset(['GET', 'HEAD', 'POST']),
+            raise_on_status=False
         )
-        adapter = HTTPAdapter(max_retries=retry_strategy)
+        # Enough pooled connections for every concurrent asset fetch (items x bands),
+        # so parallel downloads reuse keep-alive sockets instead of re-handshaking
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=64, max_retries=retry_strategy)
         self.session.mount("http://", adapter)
         self.session.mount("https://", adapter)
         
+        # Initialize STAC client on the same session, so search paging reuses the
+        # retry-configured keep-alive pool instead of opening its own connections
+        stac_io = StacApiIO(timeout=30)
+        stac_io.session = self.session
+        self.stac_client = Client.open("https://earth-search.aws.element84.com/v1", stac_io=stac_io)
+        
         print(f"Download configuration:")
         print(f"  City: {self.city_data['city']}, {self.city_data['country']}")
         print(f"  Date range: {self.start_month}/{self.start_year} to {self.end_month}/{self.end_year}")
@@ -72,23 +119,21 @@ class SatelliteDownloader:
             
             if polygon_data['type'] == 'Polygon':
                 coordinates = polygon_data['coordinates'][0]
-                # Create shapely polygon for area calculation
                 polygon = Polygon(coordinates)
                 
-                # Get bounds
-                lons = [coord[0] for coord in coordinates]
-                lats = [coord[1] for coord in coordinates]
-                
+                min_lon, min_lat, max_lon, max_lat = polygon.bounds
                 bounds = {
-                    'min_lat': min(lats), 
-                    'max_lat': max(lats),
-                    'min_lon': min(lons), 
-                    'max_lon': max(lons)
+                    'min_lat': min_lat, 
+                    'max_lat': max_lat,
+                    'min_lon': min_lon, 
+                    'max_lon': max_lon
                 }
                 
                 # Calculate area in square kilometers
-                # Use a simple approximation for small areas
-                area_deg_sq = polygon.area
+                # Shoelace formula on the exterior ring (closed or not), in degrees²
+                coords = np.asarray(coordinates, dtype=np.float64)[:, :2]
+                x, y = coords[:, 0], coords[:, 1]
+                area_deg_sq = 0.5 * abs(np.dot(x, np.roll(y, -1)) - np.dot(np.roll(x, -1), y))
                 # Convert to approximate km² (rough approximation)
                 lat_center = (bounds['min_lat'] + bounds['max_lat']) / 2
                 km_per_deg_lat = 111.0
@@ -150,8 +195,8 @@ class SatelliteDownloader:
             print(f"Error formatting date range: {e}")
             return "2023-01-01/2023-12-31"  # Fallback
 
-    def query_sentinel_data(self, collection, bounds):
-        """Query Sentinel satellite data using STAC API"""
+    def query_sentinel_data(self, collection, bounds, max_items=100):
+        """Query the most recent Sentinel items (newest first) using STAC API"""
         try:
             bbox = [bounds['min_lon'], bounds['min_lat'], 
                    bounds['max_lon'], bounds['max_lat']]
@@ -163,11 +208,22 @@ class SatelliteDownloader:
             print(f"  DateTime: {datetime_range}")
             print(f"  Cloud cover: < {self.cloud_threshold}%")
             
+            cache_key = hashlib.sha1(
+                json.dumps([collection, bbox, datetime_range, self.cloud_threshold, max_items]).encode()
+            ).hexdigest()
+            cache_path = os.path.join(self.stac_cache_dir, f"{cache_key}.json")
+            if os.path.exists(cache_path) and time.time() - os.path.getmtime(cache_path) < self.stac_cache_ttl:
+                items = list(ItemCollection.from_file(cache_path))
+                print(f"Found {len(items)} items for {collection} (cached search)")
+                return items
+            
             search = self.stac_client.search(
                 collections=[collection],
                 bbox=bbox,
                 datetime=datetime_range,
-                max_items=100,
+                # Let the server sort by recency and stop after max_items
+                sortby=[{"field": "properties.datetime", "direction": "desc"}],
+                max_items=max_items,
                 query={
                     "eo:cloud_cover": {"lt": self.cloud_threshold}
                 } if collection == "sentinel-2-l2a" else {}
@@ -176,12 +232,61 @@ class SatelliteDownloader:
             items = list(search.items())
             print(f"Found {len(items)} items for {collection}")
             
+            if items:
+                ItemCollection(items).save_object(dest_href=cache_path)
+            
             return items
             
         except Exception as e:
             print(f"Error querying {collection}: {e}")
             return []
 
+    def assets_to_download(self, collection):
+        """Asset key -> local filename for the bands needed from a collection"""
+        if collection == "sentinel-2-l2a":
+            # Use the correct asset names from Earth Search API
+            assets = {
+                'blue': 'blue.tif',      # Blue band (B02)
+                'green': 'green.tif',    # Green band (B03)
+                'red': 'red.tif',        # Red band (B04)
+                'nir': 'nir.tif'         # NIR band (B08)
+            }
+            # Scene Classification is only read for cloud masking during preprocessing
+            if self.cloud_mask:
+                assets['scl'] = 'scl.tif'
+            return assets
+        
+        # sentinel-1-grd
+        return {
+            'vh': 'vh.tif',
+            'vv': 'vv.tif'
+        }
+
+    def check_download_limits(self, area_km_sq, collections, max_items_per_collection):
+        """Reject AOIs whose area or worst-case download volume exceeds the configured caps"""
+        if self.max_area_km2 is not None and area_km_sq > self.max_area_km2:
+            raise RuntimeError(
+                f"City area ~{area_km_sq:.0f} km² exceeds the {self.max_area_km2} km² limit (maxAreaKm2)"
+            )
+        
+        # Downloads are clipped to the AOI bounding box; at 10 m resolution a uint16 band
+        # holds 10,000 pixels (~20 KB uncompressed) per km²
+        b = self.aoi_bounds
+        lat_center = (b['min_lat'] + b['max_lat']) / 2
+        bbox_km_sq = ((b['max_lat'] - b['min_lat']) * 111.0 *
+                      (b['max_lon'] - b['min_lon']) * 111.0 * math.cos(math.radians(lat_center)))
+        n_assets = sum(len(self.assets_to_download(c)) for c in collections)
+        # A windowed read never exceeds one scene, so cap at a 110 x 110 km Sentinel-2 tile
+        est_asset_bytes = int(min(bbox_km_sq, 110 * 110) * 20_000)
+        est_bytes = est_asset_bytes * max_items_per_collection * n_assets
+        
+        print_progress(8, f"Estimated download size: up to {est_bytes / (1 << 20):.0f} MB")
+        if est_bytes > self.max_download_bytes:
+            raise RuntimeError(
+                f"Estimated download of {est_bytes / (1 << 30):.1f} GB exceeds the "
+                f"{self.max_download_bytes / (1 << 30):.1f} GB limit (maxDownloadBytes)"
+            )
+
     def download_item(self, item, collection, item_index):
         """Download individual satellite item"""
         try:
@@ -189,51 +294,22 @@ class SatelliteDownloader:
             item_dir = os.path.join(self.raw_dir, 'images', collection, item_id)
             os.makedirs(item_dir, exist_ok=True)
             
-            # Save item metadata
+            # Save item metadata (unchanged for a given item id, so written once)
             metadata_path = os.path.join(item_dir, 'metadata.json')
-            with open(metadata_path, 'w') as f:
-                json.dump(item.to_dict(), f, indent=2)
-            
-            # Define bands to download based on collection
-            if collection == "sentinel-2-l2a":
-                # Use the correct asset names from Earth Search API
-                assets_to_download = {
-                    'blue': 'blue.tif',      # Blue band (B02)
-                    'green': 'green.tif',    # Green band (B03)
-                    'red': 'red.tif',        # Red band (B04)
-                    'nir': 'nir.tif',        # NIR band (B08)
-                    'scl': 'scl.tif'         # Scene Classification
-                }
-            else:  # sentinel-1-grd
-                assets_to_download = {
-                    'vh': 'vh.tif',
-                    'vv': 'vv.tif'
-                }
+            if not os.path.exists(metadata_path):
+                with open(metadata_path + '.part', 'wb') as f:
+                    f.write(json_dumps(item.to_dict()))
+                os.replace(metadata_path + '.part', metadata_path)
+            
+            assets_to_download = self.assets_to_download(collection)
             
-            downloaded_count = 0
-            for asset_key, filename in assets_to_download.items():
-                if asset_key in item.assets:
-                    asset_url = item.assets[asset_key].href
-                    file_path = os.path.join(item_dir, filename)
-                    
-                    if not os.path.exists(file_path):
-                        try:
-                            print(f"  Downloading {asset_key} from {asset_url[:100]}...")
-                            response = self.session.get(asset_url, timeout=120)
-                            response.raise_for_status()
-                            
-                            with open(file_path, 'wb') as f:
-                                f.write(response.content)
-                            downloaded_count += 1
-                            print(f"  ✅ Saved {filename} ({len(response.content)} bytes)")
-                            
-                        except Exception as e:
-                            print(f"  ❌ Failed to download {asset_key} for {item_id}: {e}")
-                    else:
-                        downloaded_count += 1  # Already exists
-                        print(f"  ✅ {filename} already exists")
-                else:
-                    print(f"  ⚠️ Asset {asset_key} not found in item {item_id}")
+            # Fetch all bands of the item in parallel; each is an independent set of range reads
+            with ThreadPoolExecutor(max_workers=len(assets_to_download)) as asset_executor:
+                results = asset_executor.map(
+                    lambda asset: self.download_asset(item, asset[0], asset[1], item_dir),
+                    assets_to_download.items()
+                )
+                downloaded_count = sum(results)
             
             print(f"Downloaded {item_id}: {downloaded_count}/{len(assets_to_download)} assets")
             return True
@@ -242,48 +318,225 @@ class SatelliteDownloader:
             print(f"Error downloading item {item.id}: {e}")
             return False
 
-    def download_items_concurrently(self, items, collection):
-        """Download items with controlled concurrency"""
-        if not items:
-            return 0
+    def download_asset(self, item, asset_key, filename, item_dir):
+        """Download one asset of an item; returns True if the file is available locally"""
+        if asset_key not in item.assets:
+            print(f"  ⚠️ Asset {asset_key} not found in item {item.id}")
+            return False
         
-        print(f"Starting concurrent download of {len(items)} {collection} items...")
+        asset_url = item.assets[asset_key].href
+        file_path = os.path.join(item_dir, filename)
+        
+        if os.path.exists(file_path):
+            print(f"  ✅ {filename} already exists")
+            return True
+        
+        # Write to a temporary name and rename on success, so an interrupted download never
+        # leaves a truncated file that a later run would treat as complete
+        part_path = file_path + '.part'
+        try:
+            print(f"  Downloading {asset_key} from {asset_url[:100]}...")
+            if self.aoi_bounds is None or not self.download_asset_window(asset_url, part_path, self.aoi_bounds):
+                self.download_asset_full(asset_url, part_path)
+            os.replace(part_path, file_path)
+            print(f"  ✅ Saved {filename} ({os.path.getsize(file_path)} bytes)")
+            return True
+            
+        except Exception as e:
+            print(f"  ❌ Failed to download {asset_key} for {item.id}: {e}")
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            return False
+    
+    @contextmanager
+    def _gdal_env(self):
+        """GDAL settings for remote COG reads; rasterio environments are per thread, so each
+        worker enters its own"""
+        with rasterio.Env(
+            GDAL_DISABLE_READDIR_ON_OPEN='EMPTY_DIR',
+            CPL_VSIL_CURL_ALLOWED_EXTENSIONS='.tif',
+            # Header and IFDs of Sentinel COGs fit in the first 32 KB, so opening takes one request
+            GDAL_INGESTED_BYTES_AT_OPEN=32768,
+            # Batch block reads into as few range requests as possible, multiplexed
+            # over one HTTP/2 connection per host
+            GDAL_HTTP_MULTIRANGE='YES',
+            GDAL_HTTP_MERGE_CONSECUTIVE_RANGES='YES',
+            GDAL_HTTP_VERSION='2',
+            GDAL_HTTP_MULTIPLEX='YES',
+            VSI_CACHE='TRUE',
+            VSI_CACHE_SIZE=200_000_000,
+            CPL_VSIL_CURL_CACHE_SIZE=200_000_000
+        ) as env:
+            yield env
+
+    def _has_geotransform(self, src):
+        """True if src is georeferenced by a CRS and affine transform rather than GCPs.
+        
+        Sentinel-1 GRD assets carry only ground control points, so an AOI window cannot be
+        derived from src.crs / src.transform.
+        """
+        return src.crs is not None and not src.gcps[0]
+
+    def _aoi_window(self, src, bounds):
+        """Pixel window of ``src`` covering the WGS84 AOI bounds, clipped to the scene"""
+        left, bottom, right, top = transform_bounds(
+            'EPSG:4326', src.crs,
+            bounds['min_lon'], bounds['min_lat'], bounds['max_lon'], bounds['max_lat'],
+            densify_pts=21
+        )
+        # Expand to whole pixels so the AOI is fully covered, then clip to the scene
+        window = from_bounds(left, bottom, right, top, transform=src.transform)
+        col_off, row_off = math.floor(window.col_off), math.floor(window.row_off)
+        return Window(
+            col_off, row_off,
+            math.ceil(window.col_off + window.width) - col_off,
+            math.ceil(window.row_off + window.height) - row_off
+        ).intersection(Window(0, 0, src.width, src.height))
+
+    def download_asset_window(self, asset_url, file_path, bounds):
+        """Read only the AOI window of a remote COG via HTTP range requests and save it locally.
+        
+        Returns False without writing anything when the asset has no geotransform to window by.
+        """
+        with self._gdal_env():
+            with rasterio.open(asset_url) as src:
+                if not self._has_geotransform(src):
+                    return False
+                window = self._aoi_window(src, bounds)
+                data = src.read(1, window=window)
+                profile = src.profile
+                profile.update(
+                    driver='GTiff',
+                    count=1,
+                    height=data.shape[0],
+                    width=data.shape[1],
+                    transform=src.window_transform(window),
+                    tiled=True,
+                    blockxsize=512,
+                    blockysize=512,
+                    compress='DEFLATE'
+                )
+        
+        with rasterio.open(file_path, 'w', **profile) as dst:
+            dst.write(data, 1)
+        return True
+    
+    def download_asset_full(self, asset_url, file_path):
+        """Download a whole asset file (assets download_asset_window cannot window, e.g. Sentinel-1 GRD)"""
+        # Stream straight to disk in 1 MB chunks instead of buffering the whole GeoTIFF
+        with self.session.get(asset_url, timeout=(10, 120), stream=True) as response:
+            response.raise_for_status()
+            response.raw.decode_content = True
+            
+            expected = response.headers.get('Content-Length')
+            if 'Content-Encoding' in response.headers:
+                expected = None
+            
+            with open(file_path, 'wb') as f:
+                # Reserve the full size up front so large GRD files are laid out contiguously
+                # while several downloads write concurrently
+                if expected is not None and hasattr(os, 'posix_fallocate'):
+                    try:
+                        os.posix_fallocate(f.fileno(), 0, int(expected))
+                    except OSError:
+                        pass
+                shutil.copyfileobj(response.raw, f, length=1024 * 1024)
+                received = f.tell()
+                f.truncate(received)
+            
+            # Catch connections that closed early without an error
+            if expected is not None and received != int(expected):
+                raise IOError(f"incomplete download: {received} of {expected} bytes")
+    
+    def _probe_read_timing(self, asset_url):
+        """Time one windowed AOI read through GDAL, the same transport the downloads use.
+        
+        Returns (open seconds, read seconds); opening is dominated by request latency,
+        the window read by transfer. The fetched ranges stay in GDAL's curl cache, so the
+        real download of this asset reuses them.
+        """
+        if self._probe_result is None:
+            try:
+                with self._gdal_env():
+                    start = time.perf_counter()
+                    with rasterio.open(asset_url) as src:
+                        opened = time.perf_counter()
+                        if not self._has_geotransform(src):
+                            raise ValueError("asset is GCP-georeferenced, no window to read")
+                        src.read(1, window=self._aoi_window(src, self.aoi_bounds))
+                    done = time.perf_counter()
+                self._probe_result = (opened - start, max(done - opened, 1e-3))
+                print(f"Read probe: open {self._probe_result[0] * 1000:.0f} ms, "
+                      f"window read {self._probe_result[1] * 1000:.0f} ms")
+            except Exception as e:
+                print(f"Read probe failed, using default concurrency: {e}")
+                self._probe_result = (None, None)
+        return self._probe_result
+
+    def choose_max_workers(self, tagged_items):
+        """Pick item-level concurrency from the probed open/read timing"""
+        if self.aoi_bounds is None:
+            return min(8, len(tagged_items))
+        
+        collection, item = tagged_items[0]
+        assets = self.assets_to_download(collection)
+        asset_key = next(iter(assets))
+        open_s, read_s = (None, None)
+        if asset_key in item.assets:
+            open_s, read_s = self._probe_read_timing(item.assets[asset_key].href)
+        if not open_s:
+            return min(8, len(tagged_items))
+        
+        # While one read waits on latency others can transfer, so scale with the
+        # latency/transfer ratio. Each item reads all its bands in parallel; cap the items
+        # so at most 64 range reads are in flight.
+        workers = 1 + int(open_s / read_s)
+        max_items = max(4, 64 // len(assets))
+        return min(max(4, min(max_items, workers)), len(tagged_items))
+
+    def download_items_concurrently(self, tagged_items, base_progress, progress_range):
+        """Download (collection, item) pairs from all collections through one shared pool"""
+        successful_downloads = {collection: 0 for collection, _ in tagged_items}
+        if not tagged_items:
+            return successful_downloads
+        
+        print(f"Starting concurrent download of {len(tagged_items)} items...")
         
         # Limit concurrent downloads to avoid overwhelming the server
-        MAX_WORKERS = min(8, len(items))
-        successful_downloads = 0
+        MAX_WORKERS = self.choose_max_workers(tagged_items)
+        print(f"Using {MAX_WORKERS} concurrent item downloads")
         
         with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-            # Submit download tasks
+            # Submit download tasks; items are submitted in list order, so callers put the
+            # priority collection first
             future_to_item = {
-                executor.submit(self.download_item, item, collection, i): (item, i) 
-                for i, item in enumerate(items)
+                executor.submit(self.download_item, item, collection, i): (collection, item, i)
+                for i, (collection, item) in enumerate(tagged_items)
             }
             
             completed = 0
+            last_emit = 0.0
             for future in as_completed(future_to_item):
                 completed += 1
-                item, item_index = future_to_item[future]
+                collection, item, item_index = future_to_item[future]
                 
                 try:
                     success = future.result()
                     if success:
-                        successful_downloads += 1
+                        successful_downloads[collection] += 1
                 except Exception as e:
                     print(f"Download task failed: {e}")
                 
-                # Update progress
-                if collection == "sentinel-2-l2a":
-                    base_progress = 20
-                    progress_range = 50
-                else:  # sentinel-1-grd
-                    base_progress = 70
-                    progress_range = 20
-                
-                progress = base_progress + int((completed / len(items)) * progress_range)
-                print_progress(progress, f"Downloaded {completed}/{len(items)} {collection} items")
+                # Update progress at most once a second, always reporting the final count
+                now = time.monotonic()
+                if now - last_emit >= 1.0 or completed == len(tagged_items):
+                    progress = base_progress + int((completed / len(tagged_items)) * progress_range)
+                    print_progress(progress, f"Downloaded {completed}/{len(tagged_items)} items ({collection})")
+                    last_emit = now
         
-        print(f"Successfully downloaded {successful_downloads}/{len(items)} {collection} items")
+        for collection, count in successful_downloads.items():
+            total = sum(1 for c, _ in tagged_items if c == collection)
+            print(f"Successfully downloaded {count}/{total} {collection} items")
         return successful_downloads
 
     def download_satellite_data(self):
@@ -293,27 +546,32 @@ class SatelliteDownloader:
             
             # Get city bounds and polygon (ensures we use the polygon boundaries)
             bounds, polygon, area_km_sq = self.get_city_bounds_and_polygon()
+            self.aoi_bounds = bounds
             
-            print_progress(10, "Querying available satellite data...")
+            # Limit items for web app performance (prioritize recent data)
+            max_items_per_collection = 20
             
-            # Query Sentinel-2 data (optical)
-            s2_items = self.query_sentinel_data("sentinel-2-l2a", bounds)
+            # Sentinel-2 (optical) is always needed; Sentinel-1 (SAR) is only for additional
+            # analysis that the NDVI pipeline does not use, so it is opt-in
+            collections = ["sentinel-2-l2a"]
+            if self.include_sar:
+                collections.append("sentinel-1-grd")
             
-            # Query Sentinel-1 data (SAR) - optional for additional analysis
-            s1_items = self.query_sentinel_data("sentinel-1-grd", bounds)
+            self.check_download_limits(area_km_sq, collections, max_items_per_collection)
             
-            print_progress(15, f"Found {len(s2_items)} Sentinel-2 and {len(s1_items)} Sentinel-1 items")
+            print_progress(10, "Querying available satellite data...")
             
-            # Limit items for web app performance (prioritize recent data)
-            max_items_per_collection = 20
-            if len(s2_items) > max_items_per_collection:
-                # Sort by date and take most recent
-                s2_items = sorted(s2_items, key=lambda x: x.datetime, reverse=True)[:max_items_per_collection]
-                print(f"Limited to {max_items_per_collection} most recent Sentinel-2 items")
+            # Run the searches concurrently; they are independent round trips
+            with ThreadPoolExecutor(max_workers=len(collections)) as executor:
+                futures = {
+                    executor.submit(self.query_sentinel_data, c, bounds, max_items_per_collection): c
+                    for c in collections
+                }
+                found = {futures[f]: f.result() for f in as_completed(futures)}
+            s2_items = found["sentinel-2-l2a"]
+            s1_items = found.get("sentinel-1-grd", [])
             
-            if len(s1_items) > max_items_per_collection:
-                s1_items = sorted(s1_items, key=lambda x: x.datetime, reverse=True)[:max_items_per_collection]
-                print(f"Limited to {max_items_per_collection} most recent Sentinel-1 items")
+            print_progress(15, f"Found {len(s2_items)} Sentinel-2 and {len(s1_items)} Sentinel-1 items")
             
             total_items = len(s2_items) + len(s1_items)
             
@@ -329,17 +587,13 @@ class SatelliteDownloader:
             
             print_progress(20, f"Starting download of {total_items} items...")
             
-            # Download Sentinel-2 data (priority for vegetation analysis)
-            s2_downloaded = 0
-            if s2_items:
-                print_progress(20, "Downloading Sentinel-2 data...")
-                s2_downloaded = self.download_items_concurrently(s2_items, "sentinel-2-l2a")
-            
-            # Download Sentinel-1 data
-            s1_downloaded = 0
-            if s1_items:
-                print_progress(70, "Downloading Sentinel-1 data...")
-                s1_downloaded = self.download_items_concurrently(s1_items, "sentinel-1-grd")
+            # Sentinel-2 (priority for vegetation analysis) and Sentinel-1 items share one pool so
+            # the connection stays busy while assets of different sizes finish at different times
+            tagged_items = ([("sentinel-2-l2a", item) for item in s2_items] +
+                            [("sentinel-1-grd", item) for item in s1_items])
+            downloaded = self.download_items_concurrently(tagged_items, 20, 70)
+            s2_downloaded = downloaded.get("sentinel-2-l2a", 0)
+            s1_downloaded = downloaded.get("sentinel-1-grd", 0)
             
             print_progress(90, "Finalizing download summary...")
             
@@ -358,8 +612,8 @@ class SatelliteDownloader:
             
             # Save summary
             summary_path = os.path.join(self.raw_dir, 'download_summary.json')
-            with open(summary_path, 'w') as f:
-                json.dump(summary, f, indent=2)
+            with open(summary_path, 'wb') as f:
+                f.write(json_dumps(summary))
             
             print(f"Download Summary:")
             print(f"  Area: ~{area_km_sq:.1f} km² (polygon-based)")
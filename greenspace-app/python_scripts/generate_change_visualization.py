@@ -6,15 +6,123 @@ Generate vegetation change visualization between baseline and compare years
 import os
 import sys
 import json
+import shutil
 import numpy as np
 import cv2
 from pathlib import Path
 import glob
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
 
 def print_progress(percentage, message=""):
     """Print progress in a format that can be parsed by Node.js"""
     print(f"PROGRESS:{percentage} {message}", flush=True)
 
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, cache=True)
+    def _paint_change(baseline, compare, mask, thr, out_rgba):
+        """Classify, paint (BGRA) and count change categories in one pass over the pixels"""
+        height, width = baseline.shape
+        gain = 0
+        loss = 0
+        stable = 0
+        total = 0
+        for i in prange(height):
+            for j in range(width):
+                if not mask[i, j]:
+                    continue
+                total += 1
+                b = baseline[i, j] >= thr
+                c = compare[i, j] >= thr
+                if c and not b:
+                    out_rgba[i, j, 0] = 0
+                    out_rgba[i, j, 1] = 255
+                    out_rgba[i, j, 2] = 0
+                    out_rgba[i, j, 3] = 200
+                    gain += 1
+                elif b and not c:
+                    out_rgba[i, j, 0] = 0
+                    out_rgba[i, j, 1] = 0
+                    out_rgba[i, j, 2] = 255
+                    out_rgba[i, j, 3] = 200
+                    loss += 1
+                elif b and c:
+                    out_rgba[i, j, 0] = 128
+                    out_rgba[i, j, 1] = 0
+                    out_rgba[i, j, 2] = 128
+                    out_rgba[i, j, 3] = 150
+                    stable += 1
+        return gain, loss, stable, total
+
+def find_rgb_composite(month_dir):
+    """Return the month's RGB composite GeoTIFF, preferring composite_*.tif, in one tree walk"""
+    fallback = None
+    for path in month_dir.rglob("composite*.tif"):
+        if path.name.startswith("composite_"):
+            return path
+        if fallback is None:
+            fallback = path
+    return fallback
+
+def read_rgb_composite(rgb_file, shape):
+    """Read bands 1-3 (Red, Green, Blue) in one call, resampled to ``shape`` so GDAL
+    decodes from the nearest overview instead of full resolution"""
+    import rasterio
+    from rasterio.enums import Resampling
+    with rasterio.Env(GDAL_CACHEMAX=256, GDAL_DISABLE_READDIR_ON_OPEN='EMPTY_DIR',
+                      CPL_VSIL_CURL_ALLOWED_EXTENSIONS='.tif', GDAL_NUM_THREADS='ALL_CPUS'):
+        with rasterio.open(rgb_file) as src:
+            bands = src.read(indexes=[1, 2, 3], out_shape=(3, shape[0], shape[1]),
+                             resampling=Resampling.average)
+    return np.ascontiguousarray(np.transpose(bands, (1, 2, 0)))
+
+def normalize_rgb(rgb_data):
+    """Scale to the 0-255 range with a single saturating uint8 conversion (no float64 temporary)"""
+    m = float(rgb_data.max()) or 1.0
+    return cv2.convertScaleAbs(rgb_data, alpha=255.0 / m)
+
+def load_npy(path, dtype):
+    """Memory-map a .npy file as a C-contiguous array of ``dtype``; a copy is only made when
+    the stored dtype or layout differs (e.g. float64 NDVI from older runs)"""
+    return np.ascontiguousarray(np.load(path, mmap_mode='r'), dtype=dtype)
+
+def file_stamp(path):
+    """(mtime_ns, size) of a file, used to detect stale cached composites"""
+    st = os.stat(path)
+    return [st.st_mtime_ns, st.st_size]
+
+def load_cached_composite(cache_path, stamp_path, source_stamps, shape):
+    """Return the cached composite if it was built from exactly these monthly files"""
+    try:
+        with open(stamp_path, 'r') as f:
+            if json.load(f) != source_stamps:
+                return None
+        composite = np.load(cache_path)
+        return composite if composite.shape == shape else None
+    except (OSError, ValueError):
+        return None
+
+def save_cached_composite(cache_path, stamp_path, source_stamps, composite):
+    """Persist the composite with the stamps of the monthly files it was built from"""
+    try:
+        np.save(cache_path, composite)
+        with open(stamp_path, 'w') as f:
+            json.dump(source_stamps, f)
+    except OSError as e:
+        print(f"   ⚠️ Could not cache NDVI composite: {e}")
+
+def iter_month_dirs(year_path):
+    """Yield month subdirectories; scandir entries answer is_dir() without an extra stat"""
+    with os.scandir(year_path) as entries:
+        for entry in entries:
+            if entry.is_dir():
+                yield Path(entry.path)
+
 def load_best_data_from_year(year_dir):
     """Load the best NDVI data and RGB imagery from a year directory (from monthly results)"""
     year_path = Path(year_dir)
@@ -22,57 +130,38 @@ def load_best_data_from_year(year_dir):
         print(f"Year directory not found: {year_dir}")
         return None, None, None
     
-    # Look for NDVI data files in monthly subdirectories
-    data_files = []
-    for month_dir in year_path.iterdir():
-        if month_dir.is_dir():
-            # Look for NDVI data in this month
-            ndvi_pattern = month_dir / "vegetation_analysis" / "ndvi_data.npy"
-            if ndvi_pattern.exists():
-                data_files.append(month_dir)
-    
-    if not data_files:
-        print(f"No data files found in {year_dir}")
-        return None, None, None
-    
-    # Load all NDVI arrays and find the one with highest mean (best quality)
+    # Load each month's NDVI as it is found and keep the one with highest mean (best quality)
     best_ndvi = None
     best_rgb = None
     best_mean = -1
     best_mask = None
+    found_data = False
     
-    for month_dir in data_files:
+    for month_dir in iter_month_dirs(year_path):
         try:
             ndvi_file = month_dir / "vegetation_analysis" / "ndvi_data.npy"
-            ndvi = np.load(ndvi_file)
+            if not ndvi_file.exists():
+                continue
+            found_data = True
+            ndvi = load_npy(ndvi_file, np.float32)
             
             # Look for corresponding city mask
             mask_file = month_dir / "vegetation_analysis" / "city_mask.npy"
             if mask_file.exists():
-                city_mask = np.load(mask_file)
+                city_mask = load_npy(mask_file, np.bool_)
             else:
                 city_mask = np.ones_like(ndvi, dtype=bool)
             
             # Look for RGB composite image
-            rgb_files = list(month_dir.glob("**/composite_*.tif"))
-            if not rgb_files:
-                rgb_files = list(month_dir.glob("**/composite*.tif"))
+            rgb_file = find_rgb_composite(month_dir)
             
             rgb_data = None
-            if rgb_files:
+            if rgb_file is not None:
                 try:
-                    import rasterio
-                    with rasterio.open(rgb_files[0]) as src:
-                        # Read RGB bands (typically bands 1, 2, 3 for Red, Green, Blue)
-                        rgb_data = np.stack([
-                            src.read(1),  # Red
-                            src.read(2),  # Green  
-                            src.read(3)   # Blue
-                        ], axis=2)
-                        # Normalize to 0-255 range
-                        rgb_data = np.clip((rgb_data / np.max(rgb_data)) * 255, 0, 255).astype(np.uint8)
+                    # Normalize to 0-255 range
+                    rgb_data = normalize_rgb(read_rgb_composite(rgb_file, ndvi.shape))
                 except Exception as e:
-                    print(f"Could not load RGB data from {rgb_files[0]}: {e}")
+                    print(f"Could not load RGB data from {rgb_file}: {e}")
             
             # Calculate mean NDVI within city bounds
             valid_ndvi = ndvi[city_mask & (ndvi > -1)]  # Exclude invalid values
@@ -87,8 +176,56 @@ def load_best_data_from_year(year_dir):
             print(f"Error loading data from {month_dir}: {e}")
             continue
     
+    if not found_data:
+        print(f"No data files found in {year_dir}")
+        return None, None, None
+    
     return best_ndvi, best_mask, best_rgb
 
+def load_month_data(month_dir):
+    """Load one month's vegetation summary, NDVI and city mask; None if the month has no data"""
+    try:
+        # Read the vegetation summary from each month (same as main analysis)
+        summary_file = month_dir / "vegetation_analysis" / "vegetation_analysis_summary.json"
+        if not summary_file.exists():
+            return None
+        with open(summary_file, 'r') as f:
+            summary = json.load(f)
+        
+        # Get vegetation percentage calculated by main processor
+        veg_percentage = summary.get('vegetation_percentage', 0)
+        
+        # Load NDVI data for this month (memory-mapped; pages are only read by
+        # the stacked reduction in load_composite_data_from_year)
+        ndvi_file = month_dir / "vegetation_analysis" / "ndvi_data.npy"
+        if not ndvi_file.exists():
+            return None
+        ndvi = load_npy(ndvi_file, np.float32)
+        
+        # Load city mask
+        mask_file = month_dir / "vegetation_analysis" / "city_mask.npy"
+        if mask_file.exists():
+            city_mask = load_npy(mask_file, np.bool_)
+        else:
+            city_mask = np.ones_like(ndvi, dtype=bool)
+        
+        return {
+            'ndvi': ndvi,
+            'mask': city_mask,
+            'veg_percentage': veg_percentage,
+            'month': month_dir.name,
+            'month_dir': month_dir,
+            'source_stamp': [
+                month_dir.name,
+                file_stamp(ndvi_file),
+                file_stamp(mask_file) if mask_file.exists() else None
+            ]
+        }
+    
+    except Exception as e:
+        print(f"   ❌ Error processing {month_dir}: {e}")
+        return None
+
 def load_composite_data_from_year(year_dir, veg_threshold=0.3):
     """Load and composite NDVI data from all months in a year directory - matches main analysis method"""
     year_path = Path(year_dir)
@@ -96,77 +233,36 @@ def load_composite_data_from_year(year_dir, veg_threshold=0.3):
         print(f"Year directory not found: {year_dir}")
         return None, None, None
     
-    # Look for monthly vegetation analysis summaries (same as main analysis uses)
-    monthly_data = []
-    reference_shape = None
-    reference_mask = None
-    best_rgb = None
-    
-    for month_dir in year_path.iterdir():
-        if month_dir.is_dir():
-            try:
-                # Read the vegetation summary from each month (same as main analysis)
-                summary_file = month_dir / "vegetation_analysis" / "vegetation_analysis_summary.json"
-                if summary_file.exists():
-                    with open(summary_file, 'r') as f:
-                        summary = json.load(f)
-                    
-                    # Get vegetation percentage calculated by main processor
-                    veg_percentage = summary.get('vegetation_percentage', 0)
-                    
-                    # Load NDVI data for this month
-                    ndvi_file = month_dir / "vegetation_analysis" / "ndvi_data.npy"
-                    if ndvi_file.exists():
-                        ndvi = np.load(ndvi_file)
-                        
-                        # Load city mask
-                        mask_file = month_dir / "vegetation_analysis" / "city_mask.npy"
-                        if mask_file.exists():
-                            city_mask = np.load(mask_file)
-                        else:
-                            city_mask = np.ones_like(ndvi, dtype=bool)
-                        
-                        # Set reference shape from first valid month
-                        if reference_shape is None:
-                            reference_shape = ndvi.shape
-                            reference_mask = city_mask
-                        
-                        monthly_data.append({
-                            'ndvi': ndvi,
-                            'mask': city_mask,
-                            'veg_percentage': veg_percentage,
-                            'month': month_dir.name
-                        })
-                        
-                        print(f"   📊 Month {month_dir.name}: {veg_percentage:.1f}% vegetation")
-                        
-                        # Keep RGB from first available month for visualization
-                        if best_rgb is None:
-                            rgb_files = list(month_dir.glob("**/composite_*.tif"))
-                            if not rgb_files:
-                                rgb_files = list(month_dir.glob("**/composite*.tif"))
-                            
-                            if rgb_files:
-                                try:
-                                    import rasterio
-                                    with rasterio.open(rgb_files[0]) as src:
-                                        best_rgb = np.stack([
-                                            src.read(1),  # Red
-                                            src.read(2),  # Green  
-                                            src.read(3)   # Blue
-                                        ], axis=2)
-                                        best_rgb = np.clip((best_rgb / np.max(best_rgb)) * 255, 0, 255).astype(np.uint8)
-                                except Exception as e:
-                                    print(f"   ⚠️ Could not load RGB for {month_dir.name}: {e}")
-            
-            except Exception as e:
-                print(f"   ❌ Error processing {month_dir}: {e}")
-                continue
+    # Look for monthly vegetation analysis summaries (same as main analysis uses);
+    # months are independent file loads, so they are read concurrently
+    month_dirs = list(iter_month_dirs(year_path))
+    max_workers = max(1, min(16, (os.cpu_count() or 1) * 2, len(month_dirs)))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        monthly_data = [m for m in executor.map(load_month_data, month_dirs) if m is not None]
     
     if not monthly_data:
         print("   ❌ No valid monthly data found")
         return None, None, None
     
+    for month_data in monthly_data:
+        print(f"   📊 Month {month_data['month']}: {month_data['veg_percentage']:.1f}% vegetation")
+    
+    # Set reference shape from first valid month
+    reference_shape = monthly_data[0]['ndvi'].shape
+    reference_mask = monthly_data[0]['mask']
+    
+    # Keep RGB from first available month for visualization
+    best_rgb = None
+    for month_data in monthly_data:
+        rgb_file = find_rgb_composite(month_data['month_dir'])
+        if rgb_file is None:
+            continue
+        try:
+            best_rgb = normalize_rgb(read_rgb_composite(rgb_file, month_data['ndvi'].shape))
+            break
+        except Exception as e:
+            print(f"   ⚠️ Could not load RGB for {month_data['month']}: {e}")
+    
     print(f"   📁 Loaded {len(monthly_data)} months of NDVI data")
     
     # Calculate average vegetation percentage (exactly same as main analysis)
@@ -174,22 +270,29 @@ def load_composite_data_from_year(year_dir, veg_threshold=0.3):
     average_veg_percentage = sum(monthly_percentages) / len(monthly_percentages)
     print(f"   ✅ Average vegetation: {average_veg_percentage:.1f}% (same calculation as main analysis)")
     
-    # Create composite NDVI by averaging all monthly NDVI arrays (real data only)
-    composite_ndvi = np.zeros(reference_shape, dtype=np.float32)
-    composite_count = np.zeros(reference_shape, dtype=np.int32)
-    
-    for month_data in monthly_data:
-        ndvi = month_data['ndvi']
-        mask = month_data['mask']
+    # Reuse the composite saved by a previous run while the monthly inputs are unchanged
+    cache_path = year_path / "ndvi_composite_cache.npy"
+    stamp_path = year_path / "ndvi_composite_cache.json"
+    source_stamps = sorted(m['source_stamp'] for m in monthly_data)
+    composite_ndvi = load_cached_composite(cache_path, stamp_path, source_stamps, reference_shape)
+    
+    if composite_ndvi is None:
+        # Create composite NDVI by averaging all monthly NDVI arrays (real data only),
+        # reduced in one pass over the stacked (months, H, W) arrays
+        ndvis = np.stack([m['ndvi'] for m in monthly_data])
+        masks = np.stack([m['mask'] for m in monthly_data])
         
         # Only include valid NDVI values in the composite
-        valid_pixels = mask & (ndvi > -1) & (ndvi < 1)  # Valid NDVI range
-        composite_ndvi[valid_pixels] += ndvi[valid_pixels]
-        composite_count[valid_pixels] += 1
-    
-    # Calculate average where we have data (real composite from all months)
-    valid_composite = composite_count > 0
-    composite_ndvi[valid_composite] = composite_ndvi[valid_composite] / composite_count[valid_composite]
+        valid = masks & (ndvis > -1) & (ndvis < 1)  # Valid NDVI range
+        composite_count = valid.sum(axis=0, dtype=np.int32)
+        composite_ndvi = np.where(valid, ndvis, 0).sum(axis=0, dtype=np.float32)
+        
+        # Calculate average where we have data (real composite from all months)
+        np.divide(composite_ndvi, composite_count, out=composite_ndvi, where=composite_count > 0)
+        
+        save_cached_composite(cache_path, stamp_path, source_stamps, composite_ndvi)
+    else:
+        print("   ♻️ Reusing cached NDVI composite (monthly inputs unchanged)")
     
     print(f"   🔧 Created real NDVI composite from {len(monthly_data)} months")
     print(f"   📊 Composite represents {average_veg_percentage:.1f}% vegetation (matches main analysis)")
@@ -203,15 +306,10 @@ def create_leaflet_style_background(height, width, city_mask):
     # Add subtle grid lines to mimic map tiles
     grid_spacing = max(20, min(height, width) // 20)  # Adaptive grid spacing
     
-    # Horizontal lines
-    for y in range(0, height, grid_spacing):
-        if y < height:
-            background[y, :] = [220, 220, 220]  # Slightly darker gray for grid lines
-    
-    # Vertical lines  
-    for x in range(0, width, grid_spacing):
-        if x < width:
-            background[:, x] = [220, 220, 220]  # Slightly darker gray for grid lines
+    # Grid lines in one strided store per axis (slightly darker gray)
+    grid_color = np.array([220, 220, 220], dtype=np.uint8)
+    background[::grid_spacing, :] = grid_color  # Horizontal lines
+    background[:, ::grid_spacing] = grid_color  # Vertical lines
     
     return background
 
@@ -240,16 +338,6 @@ def create_change_visualization(baseline_ndvi, compare_ndvi, city_mask, output_p
     if city_mask is None:
         city_mask = np.ones_like(baseline_ndvi, dtype=bool)
     
-    # Create vegetation masks for both years
-    baseline_veg = (baseline_ndvi >= veg_threshold) & city_mask
-    compare_veg = (compare_ndvi >= veg_threshold) & city_mask
-    
-    # Calculate change categories
-    vegetation_gain = compare_veg & ~baseline_veg  # New vegetation
-    vegetation_loss = baseline_veg & ~compare_veg  # Lost vegetation
-    vegetation_stable = baseline_veg & compare_veg  # Stable vegetation
-    no_vegetation = ~baseline_veg & ~compare_veg & city_mask  # Consistently no vegetation
-    
     # Create RGBA change visualization with transparency for map overlay
     # Start with fully transparent background
     change_image = np.zeros((height, width, 4), dtype=np.uint8)  # RGBA format
@@ -263,17 +351,32 @@ def create_change_visualization(baseline_ndvi, compare_ndvi, city_mask, output_p
     # Purple = Stable vegetation with transparency
     # Fully transparent = All other areas (let map show through)
     
-    # Apply vegetation change colors with transparency (OpenCV uses BGRA format)
-    change_image[vegetation_gain] = [0, 255, 0, 200]      # Bright green with 200/255 opacity
-    change_image[vegetation_loss] = [0, 0, 255, 200]      # Bright red with 200/255 opacity  
-    change_image[vegetation_stable] = [128, 0, 128, 150]  # Purple with 150/255 opacity (more subtle)
-    # All other areas remain transparent (0, 0, 0, 0) - map shows through
-    
-    # Calculate statistics
-    gain_pixels = np.sum(vegetation_gain)
-    loss_pixels = np.sum(vegetation_loss)
-    stable_pixels = np.sum(vegetation_stable)
-    total_city_pixels = np.sum(city_mask)
+    if NUMBA_AVAILABLE:
+        # Categories, colors and counts fused into a single pass
+        gain_pixels, loss_pixels, stable_pixels, total_city_pixels = _paint_change(
+            baseline_ndvi, compare_ndvi, np.asarray(city_mask, dtype=bool), veg_threshold, change_image
+        )
+    else:
+        # Pack the categories into one code per pixel: 2*baseline_veg + compare_veg, giving
+        # 0 = no vegetation, 1 = gain, 2 = loss, 3 = stable, and 4 = outside the city
+        code = (baseline_ndvi >= veg_threshold).astype(np.uint8) << 1
+        code |= compare_ndvi >= veg_threshold
+        code[~np.asarray(city_mask, dtype=bool)] = 4
+        
+        # Apply vegetation change colors with transparency (OpenCV uses BGRA format)
+        palette = np.array([
+            [0, 0, 0, 0],        # No vegetation: transparent - map shows through
+            [0, 255, 0, 200],    # Gain: bright green with 200/255 opacity
+            [0, 0, 255, 200],    # Loss: bright red with 200/255 opacity
+            [128, 0, 128, 150],  # Stable: purple with 150/255 opacity (more subtle)
+            [0, 0, 0, 0]         # Outside the city: transparent
+        ], dtype=np.uint8)
+        change_image = palette[code]
+        
+        # Calculate statistics from a single counting pass
+        counts = np.bincount(code.ravel(), minlength=5)
+        gain_pixels, loss_pixels, stable_pixels = counts[1], counts[2], counts[3]
+        total_city_pixels = counts[:4].sum()
     
     gain_percentage = (gain_pixels / total_city_pixels) * 100 if total_city_pixels > 0 else 0
     loss_percentage = (loss_pixels / total_city_pixels) * 100 if total_city_pixels > 0 else 0
@@ -289,25 +392,18 @@ def create_change_visualization(baseline_ndvi, compare_ndvi, city_mask, output_p
     print(f"     🟢 Stable Vegetation: {stable_percentage:.1f}% ({stable_pixels:,} pixels)")
     print(f"     📍 Total City Pixels: {total_city_pixels:,}")
     
-    # Resize image to make it 10x bigger for better visibility
-    scale_factor = 10
-    new_height = height * scale_factor
-    new_width = width * scale_factor
-    
-    # Use INTER_NEAREST to preserve sharp color boundaries
-    resized_image = cv2.resize(change_image, (new_width, new_height), interpolation=cv2.INTER_NEAREST)
-    
-    print(f"   📏 Resized image from {width}x{height} to {new_width}x{new_height} (10x larger)")
-    
-    # Save the change visualization as PNG with transparency
+    # Saved at native resolution; the map overlay is upscaled client-side with
+    # nearest-neighbour rendering (image-rendering: pixelated), which keeps the sharp
+    # color boundaries without encoding a 100x larger PNG
     try:
-        # Ensure output path has .png extension for transparency support
-        output_path_png = str(output_path).replace('.png', '_transparent.png')
-        success = cv2.imwrite(output_path_png, resized_image)
+        # Fastest deflate level: the overlay is mostly runs of transparent pixels, so
+        # higher levels cost encode time for little size gain
+        success = cv2.imwrite(str(output_path), change_image, [cv2.IMWRITE_PNG_COMPRESSION, 1])
         if success:
-            print(f"   ✅ Transparent change visualization saved: {output_path_png}")
-            # Also save the original path for compatibility
-            cv2.imwrite(str(output_path), resized_image)
+            # Also provide the transparent-suffixed name for compatibility
+            output_path_png = str(output_path).replace('.png', '_transparent.png')
+            shutil.copyfile(str(output_path), output_path_png)
+            print(f"   ✅ Transparent change visualization saved: {output_path} ({width}x{height})")
         else:
             print(f"   ❌ Failed to save change visualization")
             return None
@@ -7,6 +7,21 @@ This version ensures satellite imagery aligns perfectly with OpenStreetMap
 import os
 import sys
 import json
+
+# GDAL/PROJ defaults for remote COG reads; set before rasterio loads so every
+# process (including ones spawned by a batch runner) shares the block cache settings
+for _key, _value in {
+    'GDAL_CACHEMAX': '512',
+    'VSI_CACHE': 'TRUE',
+    'VSI_CACHE_SIZE': '50000000',
+    'CPL_VSIL_CURL_CACHE_SIZE': '200000000',
+    'CPL_VSIL_CURL_ALLOWED_EXTENSIONS': '.tif,.tiff',
+    'GDAL_HTTP_MERGE_CONSECUTIVE_RANGES': 'YES',
+    'GDAL_DISABLE_READDIR_ON_OPEN': 'EMPTY_DIR',
+    'PROJ_NETWORK': 'OFF',
+}.items():
+    os.environ.setdefault(_key, _value)
+
 import numpy as np
 import requests
 import rasterio
@@ -19,6 +34,7 @@ from pathlib import Path
 from shapely.geometry import Polygon, Point
 from pystac_client import Client
 import time
+import threading
 import warnings
 from pyproj import Transformer
 import tempfile
@@ -30,6 +46,29 @@ def print_progress(percentage, message=""):
     """Print progress in a format that can be parsed by Node.js"""
     print(f"PROGRESS:{percentage} {message}", flush=True)
 
+class RateLimiter:
+    """Token bucket allowing max_calls per per_seconds, shared across threads"""
+
+    def __init__(self, max_calls=10, per_seconds=1.0):
+        self.capacity = float(max_calls)
+        self.rate = max_calls / per_seconds
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            wait = (1.0 - self.tokens) / self.rate if self.tokens < 1.0 else 0.0
+            self.tokens -= 1.0
+        if wait > 0:
+            time.sleep(wait)
+
+# Throttles STAC API searches instead of sleeping between whole runs
+STAC_RATE_LIMITER = RateLimiter(max_calls=10, per_seconds=1)
+
 class PerfectAlignmentSatelliteProcessor:
     def __init__(self, config):
         self.config = config
@@ -53,8 +92,38 @@ class PerfectAlignmentSatelliteProcessor:
         self.wgs84_bounds = None
         self.satellite_crs = None
         
+        # City geometry and CRS transformers are year-independent, so they are
+        # computed once and reused when the same instance processes several years
+        self._city_bounds = None
+        self._transformers = {}
+        
+    def set_time_window(self, year, month=None):
+        """Point the processor at another year (and optionally month), keeping cached city geometry"""
+        self.start_year = self.end_year = int(year)
+        if month is not None:
+            self.start_month = self.end_month = f"{int(month):02d}"
+        
+    def _search_items(self, **search_kwargs):
+        """Rate-limited STAC search returning all matching items"""
+        STAC_RATE_LIMITER.acquire()
+        return list(self.stac_client.search(collections=["sentinel-2-l2a"], **search_kwargs).items())
+        
+    def _transformer_to(self, crs):
+        """Cached WGS84 -> satellite CRS transformer (PROJ setup is expensive)"""
+        key = crs.to_string()
+        transformer = self._transformers.get(key)
+        if transformer is None:
+            transformer = Transformer.from_crs('EPSG:4326', crs, always_xy=True)
+            self._transformers[key] = transformer
+        return transformer
+        
     def get_city_bounds_wgs84(self):
         """Get city bounds in WGS84 (EPSG:4326) - the standard web map projection"""
+        if self._city_bounds is None:
+            self._city_bounds = self._compute_city_bounds_wgs84()
+        return dict(self._city_bounds)
+        
+    def _compute_city_bounds_wgs84(self):
         try:
             if 'polygon_geojson' in self.city_data and self.city_data['polygon_geojson']:
                 polygon_data = self.city_data['polygon_geojson']['geometry']
@@ -266,7 +335,7 @@ class PerfectAlignmentSatelliteProcessor:
                         print(f"       📊 Source info: {src.shape}, CRS: {src.crs}, Bands: {src.count}")
                         
                         # Transform city bounds to satellite CRS - same as main download
-                        transformer = Transformer.from_crs('EPSG:4326', src.crs, always_xy=True)
+                        transformer = self._transformer_to(src.crs)
                         left, bottom = transformer.transform(city_bounds['west'], city_bounds['south'])
                         right, top = transformer.transform(city_bounds['east'], city_bounds['north'])
                         
@@ -361,26 +430,22 @@ class PerfectAlignmentSatelliteProcessor:
         print(f"📦 Bbox: {[city_bounds['west'], city_bounds['south'], city_bounds['east'], city_bounds['north']]}")
         print(f"☁️ Cloud cover: < {self.cloud_threshold}%")
         
-        search = self.stac_client.search(
-            collections=["sentinel-2-l2a"],
+        items = self._search_items(
             bbox=[city_bounds['west'], city_bounds['south'], city_bounds['east'], city_bounds['north']],
             datetime=f"{start_date.date()}/{end_date.date()}",
             query={"eo:cloud_cover": {"lt": self.cloud_threshold}}
         )
         
-        items = list(search.items())
         print(f"📡 Found {len(items)} satellite images")
         
         # If no images found, try with relaxed cloud cover
         if not items:
             print("🔄 No images found, trying with relaxed cloud cover (< 50%)...")
-            search = self.stac_client.search(
-                collections=["sentinel-2-l2a"],
+            items = self._search_items(
                 bbox=[city_bounds['west'], city_bounds['south'], city_bounds['east'], city_bounds['north']],
                 datetime=f"{start_date.date()}/{end_date.date()}",
                 query={"eo:cloud_cover": {"lt": 50}}
             )
-            items = list(search.items())
             print(f"📡 Found {len(items)} satellite images with relaxed criteria")
         
         # If still no images, try with broader date range limited to the target year
@@ -388,13 +453,11 @@ class PerfectAlignmentSatelliteProcessor:
             print("🔄 Still no images, trying broader date range (target year, relaxed clouds < 50%)...")
             year_start = datetime(self.start_year, 1, 1)
             year_end = datetime(self.end_year, 12, 31)
-            search = self.stac_client.search(
-                collections=["sentinel-2-l2a"],
+            items = self._search_items(
                 bbox=[city_bounds['west'], city_bounds['south'], city_bounds['east'], city_bounds['north']],
                 datetime=f"{year_start.date()}/{year_end.date()}",
                 query={"eo:cloud_cover": {"lt": 50}}
             )
-            items = list(search.items())
             print(f"📡 Found {len(items)} satellite images within {self.start_year}")
         
         if not items:
@@ -422,7 +485,7 @@ class PerfectAlignmentSatelliteProcessor:
                     with rasterio.Env(GDAL_HTTP_UNSAFESSL='YES'):
                         with rasterio.open(item.assets['red'].href) as src:
                             # Transform city bounds to satellite CRS with high precision
-                            transformer = Transformer.from_crs('EPSG:4326', src.crs, always_xy=True)
+                            transformer = self._transformer_to(src.crs)
                             left, bottom = transformer.transform(city_bounds['west'], city_bounds['south'])
                             right, top = transformer.transform(city_bounds['east'], city_bounds['north'])
                             
@@ -523,7 +586,7 @@ class PerfectAlignmentSatelliteProcessor:
             try:
                 with rasterio.Env(GDAL_HTTP_UNSAFESSL='YES'):
                     with rasterio.open(best_item.assets['red'].href) as src:
-                        transformer = Transformer.from_crs('EPSG:4326', src.crs, always_xy=True)
+                        transformer = self._transformer_to(src.crs)
                         left, bottom = transformer.transform(city_bounds['west'], city_bounds['south'])
                         right, top = transformer.transform(city_bounds['east'], city_bounds['north'])
                         
@@ -615,7 +678,7 @@ class PerfectAlignmentSatelliteProcessor:
                         self.satellite_crs = src.crs
                         
                         # CRITICAL: Transform city bounds from WGS84 to satellite CRS
-                        transformer = Transformer.from_crs('EPSG:4326', src.crs, always_xy=True)
+                        transformer = self._transformer_to(src.crs)
                         
                         # Transform bounds to satellite coordinate system
                         left, bottom = transformer.transform(city_bounds['west'], city_bounds['south'])
@@ -823,18 +886,15 @@ class PerfectAlignmentSatelliteProcessor:
         # Keep same month(s), city, thresholds; only year to 2020
         year_backup = self.start_year, self.end_year
         try:
-            self.start_year = 2020
-            self.end_year = 2020
+            self.set_time_window(2020)
             # Query and pick best tile as in main flow
             start_date = datetime(self.start_year, int(self.start_month), 1)
             end_date = datetime(self.end_year, int(self.end_month), 28)
-            search = self.stac_client.search(
-                collections=["sentinel-2-l2a"],
+            items = self._search_items(
                 bbox=[city_bounds['west'], city_bounds['south'], city_bounds['east'], city_bounds['north']],
                 datetime=f"{start_date.date()}/{end_date.date()}",
                 query={"eo:cloud_cover": {"lt": self.cloud_threshold}}
             )
-            items = list(search.items())
             if not items:
                 return None
             items.sort(key=lambda x: x.properties.get('eo:cloud_cover', 100))
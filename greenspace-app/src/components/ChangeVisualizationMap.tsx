@@ -143,6 +143,7 @@ export default function ChangeVisualizationMap({ city, processingId, changeVisua
                 url={`/api/preview?file=${encodeURIComponent(`outputs/${processingId}/${city.city}/vegetation_change.png`)}`}
                 bounds={overlayBounds}
                 opacity={0.7}
+                className="pixelated-overlay"
               />
             </LayersControl.Overlay>
           </LayersControl>
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Test the alignment testing system's composite stretch on degenerate input
+"""
+import tempfile
+import sys
+from pathlib import Path
+
+import numpy as np
+from rasterio.crs import CRS
+from rasterio.transform import from_origin
+
+import alignment_testing_system
+from alignment_testing_system import AlignmentTestingSystem
+
+def make_constant_bands(value=1000, shape=(64, 64)):
+    """Band data where every pixel is identical, so the 2nd and 98th percentiles coincide"""
+    band = {
+        'data': np.full(shape, value, dtype=np.uint16),
+        'transform': from_origin(0, shape[0] * 10, 10, 10),
+        'crs': CRS.from_epsg(3857),
+        'bounds': (0, 0, shape[1] * 10, shape[0] * 10)
+    }
+    return {name: band for name in ('red', 'green', 'blue', 'nir')}
+
+def composite_of_constant_input(use_numba):
+    """Run create_georeferenced_composite without the browser/STAC setup of __init__"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        system = AlignmentTestingSystem.__new__(AlignmentTestingSystem)
+        system.city = "Test"
+        system.satellite_dir = Path(temp_dir)
+
+        numba_available = alignment_testing_system.NUMBA_AVAILABLE
+        alignment_testing_system.NUMBA_AVAILABLE = use_numba
+        try:
+            return system.create_georeferenced_composite(make_constant_bands(), None)
+        finally:
+            alignment_testing_system.NUMBA_AVAILABLE = numba_available
+
+def test_constant_input_produces_image():
+    """A uniform AOI (p98 == p2) must still yield an image instead of dividing by zero"""
+    paths = [False]
+    if alignment_testing_system.NUMBA_AVAILABLE:
+        paths.append(True)
+
+    for use_numba in paths:
+        result = composite_of_constant_input(use_numba)
+        image = result['image']
+        assert image.shape == (64, 64, 3)
+        assert image.dtype == np.uint8
+        # Every pixel is equal to p2, so the stretch maps it to black
+        assert not image.any()
+    return True
+
+if __name__ == "__main__":
+    if test_constant_input_produces_image():
+        print("✅ Constant-input composite test passed")
+        sys.exit(0)
+    print("💥 Constant-input composite test failed")
+    sys.exit(1)
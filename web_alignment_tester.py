@@ -67,6 +67,13 @@ class WebAlignmentTester(AlignmentTestingSystem):
             self.emit_progress("Downloading satellite data...", 20)
             satellite_data = self.download_satellite_data(bounds)
             
+            # Reference features are static for the city, so fetch them once
+            reference_elements = self.fetch_reference_features(bounds)
+            
+            # Rasterize the OSM reference once on the original grid; corrections only move
+            # the transform, and offsets are measured as totals against this fixed reference
+            reference_raster = self.build_reference_raster(reference_elements, satellite_data)
+            
             # Iterative alignment testing
             results = []
             total_iterations = min(10, self.max_iterations)  # Limit for web
@@ -75,16 +82,20 @@ class WebAlignmentTester(AlignmentTestingSystem):
                 progress = 30 + (iteration / total_iterations) * 60
                 self.emit_progress(f"Testing alignment - iteration {iteration + 1}", progress)
                 
-                # Create test map
-                map_path = self.create_test_map(bounds, satellite_data, iteration)
-                
-                # Capture screenshot
+                # Create test map and screenshot (served per iteration by the API)
+                map_path = self.create_test_map(
+                    bounds, satellite_data, iteration, reference_elements=reference_elements
+                )
                 screenshot_path = self.capture_screenshot(map_path, iteration)
                 
-                # Analyze alignment
-                alignment_result = self.analyze_alignment(screenshot_path, iteration)
+                # Analyze alignment against the fixed OSM reference
+                alignment_result = self.analyze_alignment(satellite_data, reference_raster, iteration)
+                alignment_result['screenshot_path'] = str(screenshot_path)
                 results.append(alignment_result)
                 
+                if 'error' in alignment_result:
+                    break
+                
                 # Check if alignment is acceptable
                 if alignment_result['is_acceptable']:
                     self.emit_progress(f"Perfect alignment achieved! Misalignment: {alignment_result['misalignment_meters']:.3f}m", 100)
@@ -112,8 +123,8 @@ class WebAlignmentTester(AlignmentTestingSystem):
             logger.error(f"Web alignment test failed: {e}")
             raise
         finally:
-            if hasattr(self, 'driver'):
-                self.driver.quit()
+            # Shut down the Playwright browser, its driver process and the map server
+            self.close_browser()
 
 # API Routes
 